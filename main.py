@@ -1,9 +1,11 @@
 from src import App
 from src import LibrarySetup
+from src.cli import configure_logging
 
 library_installed = True
 
 if __name__ == "__main__":
+    configure_logging()
     if not library_installed:
         LibrarySetup().setup()
 
@@ -1,13 +1,28 @@
 # src/__init__.py
 
-from .app import App
-from .backtest import Backtest
-from .strategy import Strategy
-from .order import Order
-from .direction import Direction
-from .library_setup import LibrarySetup
-from .data_manager import DataManager
+import importlib
+
+# Public names resolve on first access, so `import src` stays cheap for headless runs that never touch
+# the Dash app or the downloader
+_EXPORTS = {
+    'App': '.app',
+    'Backtest': '.backtest',
+    'Strategy': '.strategy',
+    'Order': '.order',
+    'Direction': '.direction',
+    'LibrarySetup': '.library_setup',
+    'DataManager': '.data_manager',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
 
 # Optional package metadata
 __version__ = '1.0.0'
-__author__ = 'Elias'
\ No newline at end of file
+__author__ = 'Elias'
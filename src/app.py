@@ -1,19 +1,16 @@
-import os
-import threading
 import dash
 from dash import dcc, html, Input, Output, State, callback_context
-import plotly.express as px
 
-from .strategy import Strategy
-from .backtest import Backtest
-from .data_manager import DataManager
+from .bars import FREQUENCIES
+from .jobs import JobManager
+from .live_plot import LivePlot, INDIVIDUAL_TITLE, COMBINED_TITLE
 
 class App:
     def __init__(self):
         self.app = dash.Dash(__name__, suppress_callback_exceptions=True)
         self.available_assets = self.get_available_assets()
-        self.backtest = None
-        self.stop_event = threading.Event()
+        self.jobs = JobManager(max_workers=2)
+        self.live_plot = LivePlot()
         self.layout()
         self.callbacks()
 
@@ -57,6 +54,24 @@ class App:
                         ], style={"flex": "1"})
                     ], style={"display": "flex", "marginBottom": "15px"}),
 
+                    html.Div([
+                        html.Label("Bar Frequency:", style={"fontWeight": "bold", "marginBottom": "0px"}),
+                        dcc.Dropdown(
+                            id="bar-frequency",
+                            options=[{"label": "Raw ticks", "value": "tick"}] + [{"label": frequency, "value": frequency} for frequency in FREQUENCIES],
+                            value="tick",
+                            clearable=False,
+                            style={"marginBottom": "15px"}
+                        )
+                    ]),
+
+                    dcc.Checklist(
+                        id="profile-toggle",
+                        options=[{"label": " Profile stages", "value": "profile"}],
+                        value=[],
+                        style={"marginBottom": "15px"}
+                    ),
+
                     # Buttons (Run and Stop)
                     html.Div([
                         html.Button("Run", id="run-btn", n_clicks=0, style={
@@ -67,7 +82,17 @@ class App:
                             "width": "100%", "padding": "15px", "backgroundColor": "#f44336", "color": "white", 
                             "border": "none", "borderRadius": "15px", "cursor": "pointer", "fontSize": "16px"
                         })
-                    ], style={"display": "flex", "flexDirection": "column", "gap": "10px"})
+                    ], style={"display": "flex", "flexDirection": "column", "gap": "10px"}),
+
+                    # Every submitted run; the selected one is plotted and stopped by the Stop button
+                    html.Div([
+                        html.Label("Jobs:", style={"fontWeight": "bold", "marginBottom": "0px"}),
+                        dcc.Dropdown(id="job-selector", options=[], value=None, clearable=False),
+                        html.Div(id="job-status", style={"fontSize": "12px", "marginTop": "5px"})
+                    ], style={"marginTop": "15px"}),
+
+                    # Stage timings of a profiled run, refreshed with the plots
+                    html.Div(id="profile-panel", style={"marginTop": "15px", "fontSize": "12px"})
                 ], style={
                     "padding": "20px", "backgroundColor": "#f4f4f9", "borderRadius": "8px", 
                     "boxShadow": "0 4px 8px rgba(0,0,0,0.1)", "width": "35%", "display": "inline-block", 
@@ -76,8 +101,11 @@ class App:
 
                 # Plot Area (Shifted to the right and higher)
                 html.Div([
-                    dcc.Graph(id="individual-returns-plot", style={"height": "48vh", "marginTop": "0px"}),
-                    dcc.Graph(id="combined-returns-plot", style={"height": "48vh", "marginTop": "0px"}),
+                    dcc.Graph(id="individual-returns-plot", figure=LivePlot.empty_figure(INDIVIDUAL_TITLE), style={"height": "48vh", "marginTop": "0px"}),
+                    dcc.Graph(id="combined-returns-plot", figure=LivePlot.empty_figure(COMBINED_TITLE), style={"height": "48vh", "marginTop": "0px"}),
+
+                    # Client copy of what the plots hold, so interval ticks only send the rows that arrived since
+                    dcc.Store(id="plot-state"),
 
                     # Update interval for plot refresh
                     dcc.Interval(id="update-interval", interval=2000, n_intervals=0, disabled=True)
@@ -91,76 +119,121 @@ class App:
     def callbacks(self):
         @self.app.callback(
             Output("update-interval", "disabled"),
+            Output("job-selector", "value"),
             Input("run-btn", "n_clicks"),
             Input("stop-btn", "n_clicks"),
             State("asset-selector", "value"),
             State("lookback-input", "value"),
             State("start-year", "value"),
-            State("end-year", "value")
+            State("end-year", "value"),
+            State("bar-frequency", "value"),
+            State("profile-toggle", "value"),
+            State("job-selector", "value")
         )
 
-        def manage_backtest(run_clicks, stop_clicks, selected_assets, lookback, start_year, end_year):
+        def manage_backtest(run_clicks, stop_clicks, selected_assets, lookback, start_year, end_year, frequency, profile, job_id):
             ctx = callback_context
             if not ctx.triggered:
-                return True 
+                return True, dash.no_update
             
             triggered_id = ctx.triggered[0]["prop_id"].split(".")[0]
 
             if triggered_id == "run-btn":
-                self.stop_event.clear()
-                os.makedirs("backtests", exist_ok=True)
-                os.makedirs("data", exist_ok=True)
-
-                filename = f"backtests/backtest_{lookback}_{start_year}_{end_year}.csv"
-                
-                data_manager = DataManager(fx_pairs=selected_assets, years=range(start_year, end_year))
-                data_manager.download_missing_files()
-                
-                fx_data = data_manager.load_fx_data()
-
-                strategy = Strategy(lookback=lookback)
-                self.backtest = Backtest(fx_data, strategy, filename, self.stop_event)
-
-                threading.Thread(target=self.backtest.execute, daemon=True).start()
-                return False 
+                # Data preparation and the run itself happen on the job pool; the callback returns at once
+                job = self.jobs.submit(selected_assets, lookback, start_year, end_year, frequency, "profile" in (profile or []))
+                return False, job.id
             
             elif triggered_id == "stop-btn":
-                self.stop_event.set()
-                return True
+                self.jobs.cancel(job_id)
+                return dash.no_update, dash.no_update
             
-            return True
+            return True, dash.no_update
 
 
         @self.app.callback(
-            [Output("individual-returns-plot", "figure"), Output("combined-returns-plot", "figure")],
-            Input("update-interval", "n_intervals")
+            Output("job-selector", "options"),
+            Output("job-status", "children"),
+            Input("update-interval", "n_intervals"),
+            Input("job-selector", "value")
         )
 
-        def update_plots(n_intervals):
-            if self.backtest and hasattr(self.backtest, "results") and not self.backtest.results.empty:
-                df = self.backtest.results.cumsum()
-
-                fig1 = px.line(df, title="Individual Asset Cumulative Returns")
-                fig1.update_layout(
-                    title={"text": "Individual Asset Cumulative Returns", "y": 0.95, "x": 0.5, "xanchor": "center", "yanchor": "top"},
-                    margin=dict(l=20, r=20, t=50, b=20),
-                    showlegend=True
-                    )
-                fig1.update_xaxes(title_text="")
-                fig1.update_yaxes(title_text="")
-
-                fig2 = px.line(df.sum(axis=1), title="Combined Portfolio Cumulative Return")
-                fig2.update_layout(
-                    title={"text": "Combined Portfolio Cumulative Return", "y": 0.95, "x": 0.5, "xanchor": "center", "yanchor": "top"},
-                    margin=dict(l=20, r=20, t=50, b=20),
-                    showlegend=True
-                )                
-                fig2.update_xaxes(title_text="")
-                fig2.update_yaxes(title_text="")
-
-                return fig1, fig2
-            
-            return px.line(title={"text": "Individual Asset Cumulative Returns", "y": 0.95, "x": 0.5, "xanchor": "center", "yanchor": "top"}).update_layout(margin=dict(l=20, r=20, t=50, b=20)), px.line(title={"text": "Combined Portfolio Cumulative Return", "y": 0.95, "x": 0.5, "xanchor": "center", "yanchor": "top"}).update_layout(margin=dict(l=20, r=20, t=50, b=20))
+        def update_jobs(n_intervals, job_id):
+            options = [{"label": job.label(), "value": job.id} for job in reversed(self.jobs.list())]
+            job = self.jobs.get(job_id)
+            if job is None:
+                return options, None
+            lines = [f"Status: {job.status}" + (" (cached result)" if job.cached else ""),
+                     f"Progress: {job.progress():.1%}"]
+            if job.filename:
+                lines.append(f"Results: {job.filename}")
+            if job.error:
+                lines.append(f"Error: {job.error}")
+            return options, [html.Div(line) for line in lines]
+
+
+        @self.app.callback(
+            [Output("individual-returns-plot", "figure"), Output("combined-returns-plot", "figure"),
+             Output("individual-returns-plot", "extendData"), Output("combined-returns-plot", "extendData"),
+             Output("plot-state", "data")],
+            Input("update-interval", "n_intervals"),
+            Input("individual-returns-plot", "relayoutData"),
+            Input("combined-returns-plot", "relayoutData"),
+            Input("job-selector", "value"),
+            State("plot-state", "data")
+        )
+
+        def update_plots(n_intervals, individual_relayout, combined_relayout, job_id, state):
+            job = self.jobs.get(job_id)
+            buffer = job.live if job else None
+            if buffer is None or not len(buffer):
+                if state is None:
+                    return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+                return (self.live_plot.empty_figure(INDIVIDUAL_TITLE), self.live_plot.empty_figure(COMBINED_TITLE),
+                        dash.no_update, dash.no_update, None)
+
+            triggered_id = callback_context.triggered_id
+            zoom = state['zoom'] if state and state['run'] == buffer.run_id else None
+            if triggered_id in ("individual-returns-plot", "combined-returns-plot"):
+                change = self.live_plot.zoom_range(individual_relayout if triggered_id == "individual-returns-plot" else combined_relayout)
+                if change is None:
+                    return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+                individual, combined, state = self.live_plot.render(buffer, change[1])
+                return individual, combined, dash.no_update, dash.no_update, state
+
+            if state is None or state['run'] != buffer.run_id:
+                individual, combined, state = self.live_plot.render(buffer)
+                return individual, combined, dash.no_update, dash.no_update, state
+            if zoom is not None:
+                # A zoomed view stays put while the run continues; autoscale returns to the live tail
+                return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+
+            delta = self.live_plot.extend(buffer, state)
+            if delta is None:
+                individual, combined, state = self.live_plot.render(buffer)
+                return individual, combined, dash.no_update, dash.no_update, state
+            individual, combined, state = delta
+            return (dash.no_update, dash.no_update, individual or dash.no_update, combined or dash.no_update, state)
+
+
+        @self.app.callback(
+            Output("profile-panel", "children"),
+            Input("update-interval", "n_intervals"),
+            Input("job-selector", "value")
+        )
+
+        def update_profile(n_intervals, job_id):
+            job = self.jobs.get(job_id)
+            if job is None or job.backtest is None or not job.backtest.profiler.enabled:
+                return None
+            snapshot = job.backtest.profiler.snapshot()
+            header = html.Tr([html.Th(name) for name in ("Stage", "Calls", "Total s", "Mean us", "p99 us", "Max us")])
+            rows = [html.Tr([html.Td(name), html.Td(stats['count']), html.Td(f"{stats['total_s']:.2f}"),
+                             html.Td(f"{stats['mean_us']:.1f}"), html.Td(f"{stats['p99_us']:.0f}"), html.Td(f"{stats['max_us']:.0f}")])
+                    for name, stats in sorted(snapshot['stages'].items(), key=lambda item: -item[1]['total_s'])]
+            hot = [html.Li(f"{sample['frame']}: {sample['count']}") for sample in snapshot['samples'][:5]]
+            return [html.Label(f"Profile ({snapshot['elapsed_s']:.1f}s elapsed)", style={"fontWeight": "bold"}),
+                    html.Table([header] + rows, style={"width": "100%"}),
+                    html.Ul(hot, style={"paddingLeft": "15px"})]
 
 
     def run(self):
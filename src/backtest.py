@@ -1,58 +1,119 @@
+import os
 import pandas as pd
-import numpy as np
-from tqdm import tqdm
 
-from .direction import Direction
+from .ledger import Ledger
+from .profiler import Profiler
+from .tick_matrix import TickMatrix
+from .tick_stream import MergedTickStream
 
 class Backtest:
-    def __init__(self, fx_data, strategy, filename, stop_event):
+    def __init__(self, fx_data, strategy, filename, stop_event, flush_rows=1000, flush_seconds=5.0, progress=True, profiler=None):
         self.fx_data = fx_data
         self.strategy = strategy
         self.filename = filename
         self.stop_event = stop_event
-        self.results = pd.DataFrame()
-        self.hanging_orders = {}
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.progress = progress
+        self.profiler = profiler or Profiler()
+        self.matrix = None
+        self.ledger = None
+        # Rows run so far and the total when it is known up front, for progress reports outside tqdm
+        self.processed = 0
+        self.total = None
+        # Optional CumulativeBuffer that mirrors every ledger row for live plotting
+        self.live = None
+
+    @property
+    def results(self):
+        return self.ledger.to_frame() if self.ledger is not None else pd.DataFrame()
         
     def save_results(self):
-        if not self.results.empty:
-            self.results.to_csv(self.filename, index=True)
+        if self.ledger is not None:
+            self.ledger.flush()
+
+    def handle_orders(self, timestamp, fills):
+        # One batch of fills per tick; the closing legs' returns are summed per asset, since overlapping
+        # pairs can close the same asset on the same tick
+        row_returns = {}
+        closing = fills[fills['closing']]
+        for asset, realized in zip(closing['asset'].tolist(), closing['realized'].tolist()):
+            row_returns[asset] = row_returns.get(asset, 0.0) + (0.0 if realized != realized else realized)
+        self.ledger.append(timestamp, row_returns)
+        if self.live is not None:
+            self.live.append(timestamp, row_returns)
+    
     
+    def prepare(self, matrix):
+        self.matrix = matrix
+        self.set_assets(matrix.pairs)
+
+    def set_assets(self, assets):
+        self.strategy.set_assets(assets)
+        self.strategy.profiler = self.profiler
+        self.ledger = Ledger(assets, self.filename, self.flush_rows, self.flush_seconds)
+
+    def on_tick(self, timestamp, bid, ask, mid):
+        with self.profiler.stage('signal'):
+            orders = self.strategy.generate_trading_signal(bid, ask, mid, timestamp)
+        if orders is not None:
+            with self.profiler.stage('orders'):
+                self.handle_orders(timestamp, orders)
+        return orders
+
+    def is_flat(self):
+        return self.strategy.is_flat()
+
+    def position_state(self):
+        return self.strategy.position_state()
+
+    def restore_position_state(self, state):
+        self.strategy.restore_position_state(state)
+
+    def run_rows(self, start, stop, pbar=None):
+        matrix = self.matrix
+        bid, ask, mid, timestamps = matrix.bid, matrix.ask, matrix.mid, matrix.timestamps
+        for row in range(start, stop):
+            if self.stop_event and self.stop_event.is_set():
+                print("Backtest stopped by user.")
+                break
+
+            self.on_tick(timestamps[row], bid[row], ask[row], mid[row])
+            self.processed += 1
+            if pbar is not None:
+                pbar.update(1)
     
     def execute(self):
-        print("Starting backtest...")
-        timestamps = pd.Index(sorted(set().union(*[self.fx_data[fx].index for fx in self.fx_data])))
+        if self.progress:
+            print("Starting backtest...")
+        self.profiler.start()
+        if isinstance(self.fx_data, MergedTickStream):
+            # Out-of-core data arrives as consecutive aligned blocks that replace each other as the active matrix
+            blocks, total = iter(self.fx_data), None
+            self.set_assets(self.fx_data.pairs)
+        else:
+            with self.profiler.stage('align'):
+                matrix = self.fx_data if isinstance(self.fx_data, TickMatrix) else TickMatrix.from_frames(self.fx_data)
+            blocks, total = [matrix], len(matrix)
+            self.prepare(matrix)
+        self.total = total
+        from tqdm import tqdm
         
-        with tqdm(total=len(timestamps), desc="Backtest Progress", ncols=100, dynamic_ncols=True) as pbar:
-            for timestamp in timestamps:
-                if self.stop_event and self.stop_event.is_set():
-                    print("Backtest stopped by user.")
-                    break
-                
-                row_data = {fx: {'bid_price': self.fx_data[fx].loc[timestamp, 'bid_price'], 
-                                 'ask_price': self.fx_data[fx].loc[timestamp, 'ask_price'], 
-                                 'mid_price': (self.fx_data[fx].loc[timestamp, 'bid_price'] + self.fx_data[fx].loc[timestamp, 'ask_price'])/2} 
-                            if timestamp in self.fx_data[fx].index 
-                            else {'bid_price': np.nan, 'ask_price':np.nan, 'mid_price': np.nan} 
-                            for fx in self.fx_data}
-                orders = self.strategy.generate_trading_signal(row_data)
-                if not orders:
-                    pbar.update(1)
-                    continue
-                
-                row_returns = {"Datetime": timestamp}
-                for asset, order in orders.items():
-                    if asset in self.hanging_orders:
-                        entry_price = self.hanging_orders.pop(asset)
-                        exit_price = order.price
-                        asset_return = (exit_price - entry_price) / entry_price if order.direction == Direction.SELL else (entry_price - exit_price) / entry_price
-                        row_returns[asset] = asset_return * 100
-                    else:
-                        self.hanging_orders[asset] = order.price
-                
-                self.results = pd.concat([self.results, pd.DataFrame([row_returns]).set_index("Datetime")], ignore_index=False).fillna(0)
+        try:
+            with tqdm(total=total, desc="Backtest Progress", ncols=100, dynamic_ncols=True, disable=not self.progress) as pbar:
+                for matrix in blocks:
+                    self.matrix = matrix
+                    self.run_rows(0, len(matrix), pbar)
+                    if self.stop_event and self.stop_event.is_set():
+                        break
+        finally:
+            # Whatever ended the loop, the checkpoint on disk is left holding every recorded row
+            with self.profiler.stage('save_results'):
                 self.save_results()
-                pbar.update(1)
+            self.profiler.stop()
+            if self.profiler.enabled and self.filename:
+                self.profiler.export(f"{os.path.splitext(self.filename)[0]}_profile.json")
         
-        print("Backtest completed.")
-        self.save_results()
-        return pd.DataFrame(self.results)
+        if self.progress:
+            print("Backtest completed.")
+        return self.results
@@ -0,0 +1,81 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+
+from .tick_matrix import TickMatrix
+
+FREQUENCIES = ['1s', '5s', '1min', '5min', '15min', '1h']
+METHODS = ('last', 'ohlc')
+SIDES = ('bid', 'ask', 'mid')
+
+def frequency_ns(frequency):
+    return pd.Timedelta(frequency).value
+
+def resample(timestamps, bid, ask, frequency, method='last'):
+    # One pass over a pair's ticks: bucket boundaries come from a single diff of the floored timestamps and
+    # every field is a reduceat over those boundaries. Bars are stamped with their bucket's end, the first
+    # moment all of their ticks are known, so a backtest on bars never sees a price before it was quoted.
+    if method not in METHODS:
+        raise ValueError(f"Unknown bar method {method!r}, expected one of {METHODS}")
+    step = frequency_ns(frequency)
+    timestamps, bid, ask = TickMatrix._dedupe(timestamps, bid, ask)
+    buckets = timestamps // step
+    first = np.ones(len(buckets), dtype=bool)
+    first[1:] = buckets[1:] != buckets[:-1]
+    starts = np.flatnonzero(first)
+    ends = np.r_[starts[1:] - 1, len(buckets) - 1][:len(starts)]
+    bars = {'timestamps': (buckets[starts] + 1) * step, 'count': ends - starts + 1}
+    for side, values in zip(SIDES, (bid, ask, (bid + ask) / 2)):
+        bars[f'{side}_close'] = values[ends]
+        if method == 'ohlc':
+            bars[f'{side}_open'] = values[starts]
+            bars[f'{side}_high'] = np.maximum.reduceat(values, starts) if len(starts) else values[:0]
+            bars[f'{side}_low'] = np.minimum.reduceat(values, starts) if len(starts) else values[:0]
+    return bars
+
+class BarResampler:
+    def __init__(self, cache, frequency='1min', method='last'):
+        if method not in METHODS:
+            raise ValueError(f"Unknown bar method {method!r}, expected one of {METHODS}")
+        frequency_ns(frequency)
+        self.cache = cache
+        self.frequency = frequency
+        self.method = method
+
+    def bar_path(self, pair, year):
+        return self.cache.shard_path(pair, os.path.join('bars', f'{pair}_{year}_{self.frequency}_{self.method}'))
+
+    def source_stamps(self, shard_paths):
+        return [self.cache.source_stamp(os.path.join(path, 'timestamps.npy')) for path in shard_paths]
+
+    def load_bars(self, pair, year):
+        # Bars are rebuilt whenever any tick shard behind them was rewritten since they were cached
+        shard_paths = self.cache.year_shards(pair, year)
+        if not shard_paths:
+            return None
+        path = self.bar_path(pair, year)
+        stamps = self.source_stamps(shard_paths)
+        meta = self.cache.read_meta(path)
+        if meta is None or meta.get('source') != stamps or meta.get('price_dtype') != self.cache.price_dtype.name:
+            logging.info(f"Resampling {pair} {year} to {self.frequency} {self.method} bars")
+            timestamps, bid, ask = self.cache.load_year(pair, year)
+            bars = resample(np.asarray(timestamps), np.asarray(bid, dtype=np.float64), np.asarray(ask, dtype=np.float64),
+                            self.frequency, self.method)
+            bars = {field: values if field in ('timestamps', 'count') else values.astype(self.cache.price_dtype)
+                    for field, values in bars.items()}
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.cache.write_arrays(path, bars, meta={'source': stamps, 'frequency': self.frequency, 'method': self.method})
+            meta = self.cache.read_meta(path)
+        return dict(zip(meta['fields'], self.cache.read(path, meta['fields'])))
+
+    def load_fx_arrays(self, pairs, years):
+        # Close prices in the (timestamps, bid, ask) layout of DataManager.load_fx_arrays, ready for TickMatrix
+        fx_arrays = {}
+        for pair in pairs:
+            bars = [bar for bar in (self.load_bars(pair, year) for year in years) if bar is not None]
+            if not bars:
+                continue
+            fx_arrays[pair] = tuple(np.concatenate([bar[field] for bar in bars]) if len(bars) > 1 else bars[0][field]
+                                    for field in ('timestamps', 'bid_close', 'ask_close'))
+        return fx_arrays
@@ -0,0 +1,4 @@
+# src/bench/__init__.py
+
+from .synthetic import generate_fx_data, write_csv
+from .suite import BENCHMARKS, run_suite, compare
@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import resource
+import platform
+import concurrent.futures
+import numpy as np
+import pandas as pd
+
+from ..backtest import Backtest
+from ..data_manager import DataManager
+from ..profiler import Profiler
+from ..strategy import Strategy
+from ..tick_matrix import TickMatrix
+from .synthetic import generate_fx_data, write_csv
+
+YEAR = 2023
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def stage_seconds(profiler):
+    return {name: stats['total_s'] for name, stats in profiler.snapshot()['stages'].items()}
+
+def aligned_rows(fx_data):
+    # Every case reports its throughput in rows of the aligned tick matrix, so the cases compare directly
+    return len(TickMatrix.from_frames(fx_data))
+
+def bench_load_csv(fx_data, folder, lookback):
+    # Cold load: every yearly CSV is parsed and converted into the binary tick cache
+    data_manager = DataManager(fx_pairs=list(fx_data), years=[YEAR], folder=folder)
+    for pair in fx_data:
+        shutil.rmtree(os.path.join(folder, pair, 'cache'), ignore_errors=True)
+    started = time.perf_counter()
+    loaded = data_manager.load_fx_data()
+    seconds = time.perf_counter() - started
+    return aligned_rows(loaded), seconds, {}
+
+def bench_load_cached(fx_data, folder, lookback):
+    data_manager = DataManager(fx_pairs=list(fx_data), years=[YEAR], folder=folder)
+    data_manager.load_fx_data()
+    started = time.perf_counter()
+    loaded = data_manager.load_fx_data()
+    seconds = time.perf_counter() - started
+    return aligned_rows(loaded), seconds, {}
+
+def bench_signal(fx_data, folder, lookback):
+    matrix = TickMatrix.from_frames(fx_data)
+    strategy = Strategy(lookback=lookback)
+    strategy.set_assets(matrix.pairs)
+    strategy.profiler = Profiler(enabled=True)
+    bid, ask, mid, timestamps = matrix.bid, matrix.ask, matrix.mid, matrix.timestamps
+    started = time.perf_counter()
+    for row in range(len(matrix)):
+        strategy.generate_trading_signal(bid[row], ask[row], mid[row], timestamps[row])
+    return len(matrix), time.perf_counter() - started, stage_seconds(strategy.profiler)
+
+def bench_cointegration(fx_data, folder, lookback):
+    # Window maintenance is kept out of the timing so only the pair tests are measured
+    matrix = TickMatrix.from_frames(fx_data)
+    strategy = Strategy(lookback=lookback)
+    strategy.set_assets(matrix.pairs)
+    elapsed = 0.0
+    for row in range(len(matrix)):
+        strategy.prime(matrix.mid[row], matrix.timestamps[row])
+        if strategy.window.is_full():
+            started = time.perf_counter()
+            strategy.check_cointegration()
+            elapsed += time.perf_counter() - started
+    return len(matrix), elapsed, {}
+
+def bench_backtest(fx_data, folder, lookback):
+    profiler = Profiler(enabled=True)
+    backtest = Backtest(fx_data, Strategy(lookback=lookback), None, None, progress=False, profiler=profiler)
+    started = time.perf_counter()
+    backtest.execute()
+    return len(backtest.matrix), time.perf_counter() - started, stage_seconds(profiler)
+
+BENCHMARKS = {
+    'load_csv': bench_load_csv,
+    'load_cached': bench_load_cached,
+    'signal': bench_signal,
+    'cointegration': bench_cointegration,
+    'backtest': bench_backtest,
+}
+
+def run_case(name, n_pairs, n_ticks, seed, repeat, lookback):
+    # Runs in a fresh worker process so peak RSS belongs to this case alone; the best of `repeat` runs is kept
+    folder = tempfile.mkdtemp(prefix='bench_')
+    try:
+        fx_data = generate_fx_data(n_pairs, n_ticks, seed)
+        write_csv(folder, fx_data, YEAR)
+        rss_before = peak_rss_mb()
+        best = None
+        for _ in range(repeat):
+            ticks, seconds, stages = BENCHMARKS[name](fx_data, folder, lookback)
+            if best is None or seconds < best[1]:
+                best = (ticks, seconds, stages)
+        ticks, seconds, stages = best
+        return {
+            'benchmark': name,
+            'n_pairs': n_pairs,
+            'n_ticks': n_ticks,
+            'ticks': ticks,
+            'seconds': seconds,
+            'ticks_per_s': ticks / seconds if seconds > 0 else 0.0,
+            'peak_rss_mb': peak_rss_mb(),
+            'peak_rss_delta_mb': peak_rss_mb() - rss_before,
+            'stages_s': stages,
+        }
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+def run_suite(benchmarks, pair_counts, tick_counts, seed=0, repeat=1, lookback=30):
+    cases = [(name, n_pairs, n_ticks) for name in benchmarks for n_pairs in pair_counts for n_ticks in tick_counts]
+    results = []
+    for name, n_pairs, n_ticks in cases:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(run_case, name, n_pairs, n_ticks, seed, repeat, lookback).result()
+        print(f"{name:14s} N={n_pairs:<3d} M={n_ticks:<7d} {result['ticks_per_s']:12.0f} ticks/s "
+              f"{result['seconds']:8.3f}s  peak RSS {result['peak_rss_mb']:.0f} MB")
+        results.append(result)
+    return results
+
+def case_key(result):
+    return result['benchmark'], result['n_pairs'], result['n_ticks']
+
+def compare(results, baseline, tolerance=0.2):
+    # A case regresses when its throughput falls more than `tolerance` below the baseline's
+    reference = {case_key(result): result for result in baseline}
+    comparison = []
+    for result in results:
+        base = reference.get(case_key(result))
+        if base is None:
+            continue
+        ratio = result['ticks_per_s'] / base['ticks_per_s'] if base['ticks_per_s'] > 0 else np.inf
+        comparison.append(dict(zip(('benchmark', 'n_pairs', 'n_ticks'), case_key(result)),
+                               ticks_per_s=result['ticks_per_s'], baseline_ticks_per_s=base['ticks_per_s'],
+                               ratio=ratio, regression=ratio < 1 - tolerance))
+    return pd.DataFrame(comparison)
+
+def save(path, results, seed):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'seed': seed, 'python': platform.python_version(), 'machine': platform.machine(),
+                   'results': results}, f, indent=1)
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Benchmark the pipeline on seeded synthetic tick data")
+    parser.add_argument('--benchmark', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--pairs', type=int, nargs='+', default=[2, 4, 8], help="Asset counts N")
+    parser.add_argument('--ticks', type=int, nargs='+', default=[1000, 4000], help="Ticks per asset M")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--lookback', type=int, default=30)
+    parser.add_argument('--out', default='benchmarks/latest.json')
+    parser.add_argument('--baseline', default='benchmarks/baseline.json')
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed fractional throughput drop")
+    return parser
+
+def main(args=None):
+    if not isinstance(args, argparse.Namespace):
+        args = build_parser().parse_args(args)
+    results = run_suite(args.benchmark, args.pairs, args.ticks, args.seed, args.repeat, args.lookback)
+    save(args.out, results, args.seed)
+    if args.save_baseline:
+        save(args.baseline, results, args.seed)
+        print(f"Baseline stored at {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to store one")
+        return 0
+    comparison = compare(results, load(args.baseline), args.tolerance)
+    if comparison.empty:
+        print("No cases in common with the baseline")
+        return 0
+    print(comparison.to_string(index=False))
+    regressions = int(comparison['regression'].sum())
+    if regressions:
+        print(f"{regressions} regression(s) beyond {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import os
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+def asset_names(n_pairs):
+    return [f'syn{k:03d}' for k in range(n_pairs)]
+
+def generate_fx_data(n_pairs=4, n_ticks=10000, seed=0, start='2023-01-02', span_days=5, cointegrated=0.5, spread_pips=1.0):
+    # Returns {pair: DataFrame(bid_price, ask_price) indexed by Datetime}, the shape load_fx_data produces.
+    # Consecutive assets are planted as cointegrated couples (a share `cointegrated` of all assets): both
+    # follow one random walk, the second scaled and offset plus stationary AR(1) noise. The rest walk freely.
+    # Every asset ticks at its own Poisson rate inside its own active window, so timestamps are irregular
+    # and only partially overlap across assets.
+    rng = np.random.default_rng(seed)
+    grid = 4 * n_ticks
+    start_ns = pd.Timestamp(start).value
+    span_ns = int(span_days * 86_400e9)
+    step_ns = span_ns // grid
+
+    planted = int(n_pairs * cointegrated) // 2 * 2
+    latent = np.empty((grid, n_pairs))
+    for col in range(0, planted, 2):
+        trend = 1.0 + 0.2 * rng.random() + np.cumsum(rng.normal(0, 2e-5, grid))
+        noise = lfilter([1.0], [1.0, -0.9], rng.normal(0, 1e-5, grid))
+        latent[:, col] = trend
+        latent[:, col + 1] = (0.5 + rng.random()) * trend + rng.normal(0, 0.1) + noise
+    for col in range(planted, n_pairs):
+        latent[:, col] = 1.0 + rng.random() + np.cumsum(rng.normal(0, 2e-5, grid))
+
+    fx_data = {}
+    for col, pair in enumerate(asset_names(n_pairs)):
+        first = int(rng.uniform(0, 0.2) * grid)
+        last = grid - int(rng.uniform(0, 0.2) * grid)
+        slots = np.sort(rng.choice(np.arange(first, last), size=min(n_ticks, last - first), replace=False))
+        # Millisecond jitter inside each grid slot keeps the timestamps irregular, like histdata's quotes
+        timestamps = start_ns + slots * step_ns + rng.integers(0, max(step_ns // 1_000_000, 1), len(slots)) * 1_000_000
+        mid = latent[slots, col]
+        half_spread = spread_pips * 1e-4 / 2 * (1 + rng.random(len(slots)))
+        index = pd.DatetimeIndex(np.sort(timestamps).view('datetime64[ns]'), name='Datetime')
+        fx_data[pair] = pd.DataFrame({'bid_price': mid - half_spread, 'ask_price': mid + half_spread}, index=index)
+    return fx_data
+
+def write_csv(folder, fx_data, year):
+    # Lays the data out as data/{pair}/{pair}_{year}.csv, the files DataManager reads
+    for pair, df in fx_data.items():
+        os.makedirs(os.path.join(folder, pair), exist_ok=True)
+        df.to_csv(os.path.join(folder, pair, f'{pair}_{year}.csv'), date_format='%Y-%m-%dT%H:%M:%S.%f')
@@ -0,0 +1,125 @@
+import time
+import logging
+import argparse
+import importlib
+
+STARTED = time.perf_counter()
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Subcommands that live in their own module; it is imported only when its command runs
+DELEGATED = {
+    'sweep': ('.sweep', "Run a parameter sweep over lookbacks, significance levels, years and baskets"),
+    'bench': ('.bench.suite', "Benchmark the pipeline on seeded synthetic tick data"),
+}
+
+def configure_logging(level='INFO'):
+    logging.basicConfig(level=getattr(logging, str(level).upper()), format=LOG_FORMAT)
+
+def elapsed_ms(since=STARTED):
+    return (time.perf_counter() - since) * 1000
+
+def parse_years(value):
+    start, end = (int(year) for year in value.split('-'))
+    return start, end
+
+def build_backtest_parser(parser):
+    parser.add_argument('--pairs', required=True, help="Comma-separated assets")
+    parser.add_argument('--years', type=parse_years, default=(2023, 2024), help="START-END, end exclusive")
+    parser.add_argument('--lookback', type=int, default=30)
+    parser.add_argument('--significance', type=float, default=None, help="Cointegration p-value cutoff; defaults to the strategy's")
+    parser.add_argument('--frequency', default='tick', help="'tick' or a bar frequency such as 1s, 1min, 1h")
+    parser.add_argument('--memory-limit-mb', type=float, default=None, help="Stream the ticks from the cache within this budget")
+    parser.add_argument('--data-folder', default='data')
+    parser.add_argument('--out', default=None, help="Ledger file; defaults to backtests/ under the same name and cache key the dashboard's job manager uses")
+    parser.add_argument('--no-download', action='store_true')
+    parser.add_argument('--profile', action='store_true', help="Time the pipeline stages and export them next to the ledger")
+    parser.add_argument('--progress', action='store_true', help="Show a progress bar")
+    return parser
+
+def build_download_parser(parser):
+    parser.add_argument('--pairs', required=True, help="Comma-separated assets")
+    parser.add_argument('--years', type=parse_years, default=(2023, 2024), help="START-END, end exclusive")
+    parser.add_argument('--data-folder', default='data')
+    parser.add_argument('--verify', action='store_true', help="Re-checksum cached months against the manifest")
+    return parser
+
+def build_parser(parser=None):
+    # --log-level is accepted before or after the command
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--log-level', default=argparse.SUPPRESS, choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    parser = parser or argparse.ArgumentParser(prog='python -m src', description="Headless pairs-trading pipeline", parents=[common])
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_backtest_parser(commands.add_parser('backtest', help="Run one backtest without the dashboard", parents=[common]))
+    build_download_parser(commands.add_parser('download', help="Download missing or stale months into the tick cache", parents=[common]))
+    for name, (_, description) in DELEGATED.items():
+        # Their options belong to the module's own parser, which is only built once the command is chosen
+        commands.add_parser(name, help=description, add_help=False, parents=[common])
+    return parser
+
+def run_backtest(args):
+    imported = time.perf_counter()
+    from .backtest import Backtest
+    from .data_manager import DataManager
+    from .jobs import JobManager, result_path
+    from .profiler import Profiler
+    from .strategy import Strategy
+    from .tick_matrix import TickMatrix
+    logging.info(f"Imports: {elapsed_ms(imported):.0f} ms")
+
+    pairs = args.pairs.split(',')
+    start, end = args.years
+    data_manager = DataManager(fx_pairs=pairs, years=range(start, end), folder=args.data_folder)
+    loading = time.perf_counter()
+    if not args.no_download:
+        data_manager.download_missing_files()
+    if args.memory_limit_mb is not None:
+        fx_data = data_manager.stream_fx_data(args.memory_limit_mb)
+    elif args.frequency == 'tick':
+        fx_data = TickMatrix.from_arrays(data_manager.load_fx_arrays())
+    else:
+        fx_data = TickMatrix.from_arrays(data_manager.load_fx_bars(args.frequency))
+    logging.info(f"Data: {elapsed_ms(loading):.0f} ms")
+
+    params = JobManager.job_params(pairs, args.lookback, start, end, args.frequency)
+    strategy_params = {'lookback': args.lookback}
+    if args.significance is not None:
+        # The dashboard always runs the default cutoff, so only a different one enters the key
+        params['significance'] = strategy_params['significance'] = args.significance
+    filename = args.out or result_path('backtests', params, JobManager.cache_key(params, data_manager.data_digest()))
+    strategy = Strategy(**strategy_params)
+    backtest = Backtest(fx_data, strategy, filename, None, progress=args.progress, profiler=Profiler(enabled=args.profile))
+    logging.info(f"Startup to first tick: {elapsed_ms():.0f} ms")
+    running = time.perf_counter()
+    results = backtest.execute()
+    seconds = time.perf_counter() - running
+    logging.info(f"{backtest.processed} ticks in {seconds:.2f}s, {len(results)} ledger rows written to {filename}")
+    print(results.sum().to_string())
+    return 0
+
+def run_download(args):
+    from .data_manager import DataManager
+    start, end = args.years
+    data_manager = DataManager(fx_pairs=args.pairs.split(','), years=range(start, end), folder=args.data_folder)
+    stats = data_manager.download_missing_files(verify=args.verify)
+    print(f"{len(stats['written'])} month(s) stored, {len(stats['failed'])} failed")
+    return 1 if stats['failed'] else 0
+
+def run_delegated(args, rest):
+    module_name, description = DELEGATED[args.command]
+    module = importlib.import_module(module_name, __package__)
+    parser = module.build_parser(argparse.ArgumentParser(prog=f'python -m src {args.command}', description=description))
+    result = module.main(parser.parse_args(rest))
+    return result if isinstance(result, int) else 0
+
+def main(args=None):
+    parser = build_parser()
+    args, rest = parser.parse_known_args(args)
+    configure_logging(getattr(args, 'log_level', 'INFO'))
+    if args.command in DELEGATED:
+        return run_delegated(args, rest)
+    if rest:
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+    if args.command == 'backtest':
+        return run_backtest(args)
+    return run_download(args)
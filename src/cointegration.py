@@ -0,0 +1,112 @@
+import numpy as np
+
+# MacKinnon (1994) response surface for the constant-only ADF regression on a single series,
+# the same coefficients statsmodels' mackinnonp uses for adfuller(regression='c')
+TAU_MAX = 2.74
+TAU_MIN = -18.83
+TAU_STAR = -1.61
+TAU_SMALLP = np.array([2.1659, 1.4412, 3.8269e-02])
+TAU_LARGEP = np.array([1.7339, 9.3202e-01, -1.2745e-01, -1.0368e-02])
+
+def default_maxlag(nobs):
+    # Schwert (1989) rule, capped the way adfuller caps it for a constant-only regression
+    return max(min(nobs // 2 - 2, int(np.ceil(12.0 * np.power(nobs / 100.0, 1 / 4.0)))), 0)
+
+def mackinnon_pvalues(stats):
+    # scipy.special costs a fifth of a second to import; it is loaded by the first test rather than at startup
+    from scipy.special import ndtr
+    stats = np.asarray(stats, dtype=np.float64)
+    small = np.polynomial.polynomial.polyval(stats, TAU_SMALLP)
+    large = np.polynomial.polynomial.polyval(stats, TAU_LARGEP)
+    pvalues = ndtr(np.where(stats <= TAU_STAR, small, large))
+    pvalues[stats > TAU_MAX] = 1.0
+    pvalues[stats < TAU_MIN] = 0.0
+    return pvalues
+
+def hedge_ratios(prices, left, right):
+    # OLS of prices[:, left] on [1, prices[:, right]] for every pair from one covariance product
+    means = prices.mean(axis=0)
+    centered = prices - means
+    cov = centered.T @ centered
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = cov[left, right] / cov[right, right]
+    intercepts = means[left] - slopes * means[right]
+    residuals = prices[:, left] - prices[:, right] * slopes - intercepts
+    return slopes, intercepts, residuals
+
+def _triangular(X, y):
+    # R factor of the augmented design [X | y]: R[:k, k] is Q'y and the tail of that column gives the
+    # residual sum of squares of every leading-column sub-regression in a single batched QR. Columns are
+    # normalised first; t-statistics and AIC differences are invariant to that scaling.
+    augmented = np.concatenate([X, y[..., None]], axis=-1)
+    norms = np.sqrt(np.einsum('pnk,pnk->pk', augmented, augmented))
+    augmented /= np.where(norms > 0, norms, 1)[:, None, :]
+    return np.linalg.qr(augmented, mode='r')
+
+def _rank(R, nobs):
+    diag = np.abs(np.diagonal(R[:, :-1, :-1], axis1=1, axis2=2))
+    tol = diag.max(axis=-1, keepdims=True) * max(nobs, diag.shape[-1]) * np.finfo(R.dtype).eps
+    return np.cumsum(diag > tol, axis=-1)
+
+def _design(levels, diffs, nobs, lags):
+    # ADF regressors over the last `nobs` differences: constant, `lags` lagged differences, then the lagged level
+    n = levels.shape[0]
+    columns = [np.ones((nobs, levels.shape[1]))]
+    columns += [diffs[n - 1 - nobs - k:n - 1 - k] for k in range(1, lags + 1)]
+    columns.append(levels[n - nobs - 1:n - 1])
+    return np.stack(columns, axis=-1).transpose(1, 0, 2)
+
+def adf_test(residuals, maxlag=None, autolag='aic'):
+    # ADF with a constant on every column of `residuals` at once. With autolag='aic' the lag order is chosen
+    # per series exactly as statsmodels' adfuller does; with autolag=None every series uses `maxlag` lags.
+    residuals = np.asarray(residuals, dtype=np.float64)
+    n, count = residuals.shape
+    if maxlag is None:
+        maxlag = default_maxlag(n)
+    diffs = np.diff(residuals, axis=0)
+
+    if autolag:
+        # All candidate lag orders share the common sample, so one QR with the level moved to the front
+        # yields every nested regression's residual sum of squares
+        nobs = n - 1 - maxlag
+        X = _design(residuals, diffs, nobs, maxlag)
+        X = np.concatenate([X[..., :1], X[..., -1:], X[..., 1:-1]], axis=-1)
+        R = _triangular(X, diffs[-nobs:].T)
+        tail = np.cumsum(R[:, ::-1, -1] ** 2, axis=-1)[:, ::-1]
+        ranks = _rank(R, nobs)
+        best_aic = np.full(count, np.inf)
+        lags = np.zeros(count, dtype=np.int64)
+        for lag in range(maxlag + 1):
+            ssr = tail[:, lag + 2]
+            with np.errstate(divide='ignore'):
+                aic = nobs * (np.log(2 * np.pi) + np.log(ssr / nobs) + 1) + 2 * ranks[:, lag + 1]
+            better = aic < best_aic
+            best_aic[better] = aic[better]
+            lags[better] = lag
+    else:
+        lags = np.full(count, maxlag, dtype=np.int64)
+
+    stats = np.full(count, np.nan)
+    for lag in np.unique(lags):
+        members = np.flatnonzero(lags == lag)
+        nobs = n - 1 - lag
+        R = _triangular(_design(residuals[:, members], diffs[:, members], nobs, lag), diffs[-nobs:, members].T)
+        k = lag + 2
+        scale = np.sqrt(R[:, k, k] ** 2 / (nobs - _rank(R, nobs)[:, -1]))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stats[members] = np.sign(R[:, k - 1, k - 1]) * R[:, k - 1, k] / scale
+
+    return stats, mackinnon_pvalues(stats), lags
+
+def engle_granger(prices, left, right, maxlag=None, autolag='aic'):
+    slopes, intercepts, residuals = hedge_ratios(prices, left, right)
+    spread = residuals.max(axis=0) - residuals.min(axis=0)
+    scale = np.abs(prices[:, left]).max(axis=0)
+    # A constant residual series has no unit-root test; adfuller would refuse it
+    testable = np.isfinite(slopes) & (spread > scale * 1e-12)
+
+    pvalues = np.full(len(left), np.nan)
+    stats = np.full(len(left), np.nan)
+    if testable.any():
+        stats[testable], pvalues[testable], _ = adf_test(residuals[:, testable], maxlag, autolag)
+    return slopes, intercepts, stats, pvalues, residuals.std(axis=0)
@@ -1,138 +1,117 @@
 import os
 import glob
-import zipfile
+import hashlib
 import logging
+from datetime import date, datetime, timezone
 from pathlib import Path
+import numpy as np
 import pandas as pd
-import concurrent.futures
-from histdata import download_hist_data as dl
-from histdata.api import Platform as P, TimeFrame as TF
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler() 
-    ]
-)
+from .bars import BarResampler
+from .downloader import Downloader
+from .tick_cache import TickCache
+from .tick_stream import MergedTickStream
 
 class DataManager:
-    def __init__(self, fx_pairs, years, folder='data'):
+    def __init__(self, fx_pairs, years, folder='data', price_dtype=np.float64, fetch=None, workers=8, retries=3):
         self.fx_pairs = fx_pairs
         self.years = years
         self.folder = folder
+        self.cache = TickCache(folder, price_dtype)
+        self.downloader = Downloader(folder, fetch=fetch, workers=workers, retries=retries, cache=self.cache)
     
-    def check_missing_files(self):
-        missing_files = []
+    @staticmethod
+    def available_months(year):
+        today = date.today()
+        if year > today.year:
+            return range(1, 1)
+        return range(1, 13 if year < today.year else today.month + 1)
+
+    def month_status(self, pair, year, month, verify=False):
+        path = self.cache.shard_path(pair, self.cache.month_shard_name(pair, year, month))
+        meta = self.cache.read_meta(path)
+        if meta is None:
+            return 'missing'
+
+        manifest = self.downloader.manifest(pair)
+        if manifest.entry(year, month) is None:
+            # Shards written before the manifest existed are adopted with their original fetch time
+            fetched_at = meta.get('fetched_at')
+            if fetched_at is not None:
+                fetched_at = datetime.fromisoformat(fetched_at)
+            else:
+                fetched_at = datetime.fromtimestamp(os.path.getmtime(os.path.join(path, 'meta.json')), timezone.utc)
+            manifest.record(year, month, *self.cache.read(path), fetched_at=fetched_at)
+            manifest.save()
+
+        if not manifest.is_current(year, month, meta.get('rows')):
+            return 'stale'
+        if verify and not manifest.verify(year, month, *self.cache.read(path)):
+            return 'stale'
+        return 'current'
+
+    def check_missing_files(self, verify=False):
+        missing_months = []
         for pair in self.fx_pairs:
             pair_path = os.path.join(self.folder, pair)
             os.makedirs(pair_path, exist_ok=True)
             for year in self.years:
-                expected_file = os.path.join(pair_path, f'{pair}_{year}.csv')
-                if not os.path.exists(expected_file):
-                    missing_files.append((pair, year))
-        return missing_files
+                if os.path.exists(os.path.join(pair_path, f'{pair}_{year}.csv')):
+                    continue
+                for month in self.available_months(year):
+                    if self.month_status(pair, year, month, verify) != 'current':
+                        missing_months.append((pair, year, month))
+        return missing_months
     
+    def data_digest(self):
+        # Fingerprint of the exact data a run sees: the manifest checksum of every month, or the size and
+        # modification time of a yearly CSV, which is read in place of the months
+        digest = hashlib.sha256()
+        for pair in sorted(self.fx_pairs):
+            manifest = self.downloader.manifest(pair)
+            for year in self.years:
+                csv_path = os.path.join(self.folder, pair, f'{pair}_{year}.csv')
+                if os.path.exists(csv_path):
+                    stat = os.stat(csv_path)
+                    digest.update(f'{pair}:{year}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+                    continue
+                for month in self.available_months(year):
+                    entry = manifest.entry(year, month)
+                    digest.update(f"{pair}:{year}:{month}:{entry['checksum'] if entry else None}".encode())
+        return digest.hexdigest()
+
     def download_and_extract(self, pair, year):
-        pair_folder = os.path.join(self.folder, pair)
-        os.makedirs(pair_folder, exist_ok=True)
-        all_bid_data, all_ask_data = [], []
-        
-        for month in range(1, 13):
-            logging.debug(f"Downloading data for {pair} {year}-{month}")
-            try:
-                bid_zip_folder = dl(year=str(year), month=str(month).zfill(2), pair=pair, platform=P.NINJA_TRADER, time_frame=TF.TICK_DATA_BID)
-                ask_zip_folder = dl(year=str(year), month=str(month).zfill(2), pair=pair, platform=P.NINJA_TRADER, time_frame=TF.TICK_DATA_ASK)                
-            except Exception as e:
-                logging.error(f"Failed to download bid data for {pair} {year}-{month}: {e}")
-                return None
-            bid_zip_folder = dl(year=str(year), month=str(month).zfill(2), pair=pair, platform=P.NINJA_TRADER, time_frame=TF.TICK_DATA_BID)
-            ask_zip_folder = dl(year=str(year), month=str(month).zfill(2), pair=pair, platform=P.NINJA_TRADER, time_frame=TF.TICK_DATA_ASK)
-            
-            if bid_zip_folder and os.path.exists(bid_zip_folder):
-                try:
-                    with zipfile.ZipFile(bid_zip_folder, 'r') as zip_ref:
-                        for file in zip_ref.namelist():
-                            if file.endswith('.csv'):
-                                bid_data = pd.read_csv(zip_ref.open(file), sep=';', header=None, usecols=[0, 1])
-                                all_bid_data.append(bid_data)
-                    os.remove(bid_zip_folder)
-                except Exception as e:
-                    logging.error(f"Error processing bid data for {pair} {year}-{month}: {e}")
-            
-            if ask_zip_folder and os.path.exists(ask_zip_folder):
-                try:
-                    with zipfile.ZipFile(ask_zip_folder, 'r') as zip_ref:
-                        for file in zip_ref.namelist():
-                            if file.endswith('.csv'):
-                                ask_data = pd.read_csv(zip_ref.open(file), sep=';', header=None, usecols=[0, 1])
-                                all_ask_data.append(ask_data)
-                    os.remove(ask_zip_folder)
-                except Exception as e:
-                    logging.error(f"Error processing ask data for {pair} {year}-{month}: {e}")
-        
-        if all_bid_data and all_ask_data:
-            bid_data = pd.concat(all_bid_data, ignore_index=True)
-            ask_data = pd.concat(all_ask_data, ignore_index=True)
-            bid_data.columns = ['Datetime', 'bid_price']
-            ask_data.columns = ['Datetime', 'ask_price']
-            
-            try:
-                bid_data['Datetime'] = pd.to_datetime(bid_data['Datetime'], format='%Y%m%d %H%M%S%f')
-                ask_data['Datetime'] = pd.to_datetime(ask_data['Datetime'], format='%Y%m%d %H%M%S%f')
-            except Exception as e:
-                logging.error(f"Error parsing datetime for {pair} {year}: {e}")
-                return
-            
-            merged_data = pd.merge(bid_data, ask_data, on='Datetime', how='inner')
-            merged_file_path = os.path.join(pair_folder, f'{pair}_{year}.csv')
-            merged_data.to_csv(merged_file_path, index=False)
-            logging.info(f"Successfully saved {pair}_{year}.csv")
+        return self.downloader.run([(pair, year, month) for month in self.available_months(year)])
     
-    def download_missing_files(self):
-        missing_files = self.check_missing_files()
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:  # Use ThreadPoolExecutor for I/O tasks
-            futures = {executor.submit(self.download_and_extract, pair, year): (pair, year) for pair, year in missing_files}
-            
-            for future in concurrent.futures.as_completed(futures):
-                pair, year = futures[future]
-                try:
-                    future.result()  # Ensure any exception inside threads is caught
-                    logging.info(f"Successfully downloaded and processed {pair} {year}")
-                except Exception as e:
-                    logging.error(f"Error processing {pair} {year}: {e}")
+    def download_missing_files(self, verify=False):
+        return self.downloader.run(self.check_missing_files(verify))
     
-    def load_fx_data(self):
+    def load_fx_arrays(self):
         logging.info("Loading FX data...")
-        fx_data = {}
+        fx_arrays = {}
         for pair in self.fx_pairs:
-            pair_path = os.path.join(self.folder, pair)
-            files_to_process = []
-            for year in self.years:
-                file = os.path.join(pair_path, f'{pair}_{year}.csv')
-                if os.path.exists(file) :
-                    files_to_process.append(file)
-            # files_to_process = [file for year in self.years for file in glob.glob(os.path.join(pair_path, f'*{year}*.csv'))]
-            
             logging.info(f"Processing : {pair}")  
-            all_data_frames = []
+            shards = [shard for shard in (self.cache.load_year(pair, year) for year in self.years) if shard is not None]
+            if not shards:
+                continue
+            if len(shards) == 1:
+                fx_arrays[pair] = shards[0]
+            else:
+                fx_arrays[pair] = tuple(np.concatenate(field) for field in zip(*shards))
+        logging.info("Finished loading FX data.")
+        return fx_arrays
 
-            for file in files_to_process:
-                df = pd.read_csv(
-                    file, 
-                    names=['Datetime', 'bid_price', 'ask_price'], 
-                    skiprows=1, 
-                    dtype={'bid_price': 'float64', 'ask_price': 'float64'}, 
-                    low_memory=False
-                )
-                all_data_frames.append(df)
+    def load_fx_bars(self, frequency='1min', method='last'):
+        logging.info(f"Loading FX data as {frequency} bars...")
+        return BarResampler(self.cache, frequency, method).load_fx_arrays(self.fx_pairs, self.years)
 
-            all_data = pd.concat(all_data_frames, ignore_index=True)              
-            # all_data = pd.concat(
-            #     (pd.read_csv(file, names=['Datetime', 'bid_price', 'ask_price'], skiprows=1, dtype={'bid_price': 'float64', 'ask_price': 'float64'}, low_memory=False)
-            #      for file in files_to_process), ignore_index=True)
-            all_data['Datetime'] = pd.to_datetime(all_data['Datetime'])
-            all_data.set_index('Datetime', inplace=True)
-            fx_data[pair] = all_data
-        logging.info("Finished loading FX data.")
+    def stream_fx_data(self, memory_limit_mb=512):
+        # Bounded-memory alternative to load_fx_arrays for spans that do not fit in RAM
+        return MergedTickStream.from_cache(self.cache, self.fx_pairs, self.years, memory_limit_mb)
+
+    def load_fx_data(self):
+        fx_data = {}
+        for pair, (timestamps, bid, ask) in self.load_fx_arrays().items():
+            index = pd.DatetimeIndex(np.asarray(timestamps).view('datetime64[ns]'), name='Datetime')
+            fx_data[pair] = pd.DataFrame({'bid_price': bid, 'ask_price': ask}, index=index)
         return fx_data
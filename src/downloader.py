@@ -0,0 +1,169 @@
+import os
+import time
+import shutil
+import zipfile
+import logging
+import concurrent.futures
+from collections import namedtuple
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+
+from .manifest import Manifest
+from .tick_cache import TickCache
+
+DownloadUnit = namedtuple('DownloadUnit', ['pair', 'year', 'month', 'side'])
+
+# histdata TimeFrame attribute per side; histdata itself is only imported once something is downloaded
+SIDES = {'bid': 'TICK_DATA_BID', 'ask': 'TICK_DATA_ASK'}
+
+# Messages of histdata's assertions that mean the month or pair does not exist
+PERMANENT_ERRORS = ('There is no token', 'No data could be found', 'For the current year')
+
+def is_permanent(error):
+    return isinstance(error, AssertionError) and str(error).startswith(PERMANENT_ERRORS)
+
+class LocalFetcher:
+    # Offline stand-in for histdata's download_hist_data that serves zips from a fixture folder
+    def __init__(self, fixture_folder):
+        self.fixture_folder = fixture_folder
+
+    def __call__(self, year, month, pair, time_frame, platform, output_directory='.', verbose=False):
+        filename = f'DAT_{platform}_{pair.upper()}_{time_frame}_{year}{str(month).zfill(2)}.zip'
+        source = os.path.join(self.fixture_folder, filename)
+        if not os.path.exists(source):
+            raise AssertionError(f'No data could be found here: {filename}')
+        os.makedirs(output_directory, exist_ok=True)
+        target = os.path.join(output_directory, filename)
+        shutil.copyfile(source, target)
+        return target
+
+class Downloader:
+    def __init__(self, folder='data', fetch=None, workers=8, retries=3, backoff=1.0, cache=None):
+        self.folder = folder
+        self.fetch = fetch
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache or TickCache(folder)
+        self.download_folder = os.path.join(folder, '.downloads')
+        self.manifests = {}
+
+    def manifest(self, pair):
+        if pair not in self.manifests:
+            self.manifests[pair] = Manifest(self.folder, pair)
+        return self.manifests[pair]
+
+    def fetch_unit(self, unit):
+        from histdata.api import Platform as P, TimeFrame as TF
+        fetch = self.fetch
+        if fetch is None:
+            from histdata import download_hist_data as fetch
+        output_directory = os.path.join(self.download_folder, f'{unit.pair}_{unit.year}_{unit.month:02d}_{unit.side}')
+        for attempt in range(self.retries + 1):
+            try:
+                return fetch(year=str(unit.year), month=str(unit.month).zfill(2), pair=unit.pair,
+                             platform=P.NINJA_TRADER, time_frame=getattr(TF, SIDES[unit.side]),
+                             output_directory=output_directory, verbose=False)
+            except Exception as e:
+                # histdata raises AssertionError both for "no such month/pair", which retrying cannot help,
+                # and for a failed HTTP status, which is usually transient
+                if attempt == self.retries or is_permanent(e):
+                    raise
+                delay = self.backoff * 2 ** attempt
+                logging.warning(f"Retrying {unit.pair} {unit.year}-{unit.month:02d} {unit.side} in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+    @staticmethod
+    def parse_zip(zip_path):
+        frames = []
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            for file in zip_ref.namelist():
+                if file.endswith('.csv'):
+                    df = pd.read_csv(zip_ref.open(file), sep=';', header=None, usecols=[0, 1],
+                                     names=['Datetime', 'price'], dtype={'Datetime': str, 'price': 'float64'})
+                    df['Datetime'] = pd.to_datetime(df['Datetime'], format='%Y%m%d %H%M%S%f')
+                    frames.append(df)
+        if not frames:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        df = pd.concat(frames, ignore_index=True)
+        return df['Datetime'].to_numpy('datetime64[ns]').view(np.int64), df['price'].to_numpy()
+
+    def download_side(self, unit):
+        zip_path = self.fetch_unit(unit)
+        try:
+            size = os.path.getsize(zip_path)
+            timestamps, prices = self.parse_zip(zip_path)
+        finally:
+            shutil.rmtree(os.path.dirname(zip_path), ignore_errors=True)
+        return timestamps, prices, size
+
+    @staticmethod
+    def _last_per_timestamp(timestamps, prices):
+        order = np.argsort(timestamps, kind='stable')
+        timestamps, prices = timestamps[order], prices[order]
+        keep = np.ones(len(timestamps), dtype=bool)
+        keep[:-1] = timestamps[1:] != timestamps[:-1]
+        return timestamps[keep], prices[keep]
+
+    def merge_sides(self, bid, ask):
+        bid_ts, bid_prices = self._last_per_timestamp(*bid)
+        ask_ts, ask_prices = self._last_per_timestamp(*ask)
+        timestamps, bid_rows, ask_rows = np.intersect1d(bid_ts, ask_ts, assume_unique=True, return_indices=True)
+        return timestamps, bid_prices[bid_rows], ask_prices[ask_rows]
+
+    def write_month(self, pair, year, month, timestamps, bid, ask, fetched_at=None):
+        # Only this month's shard is replaced; the manifest entry is updated after the shard is in place
+        fetched_at = fetched_at or datetime.now(timezone.utc)
+        path = self.cache.shard_path(pair, self.cache.month_shard_name(pair, year, month))
+        # The checksum covers the arrays as stored, after the cast to the cache's price dtype, so verify compares like with like
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        bid = np.asarray(bid, dtype=self.cache.price_dtype)
+        ask = np.asarray(ask, dtype=self.cache.price_dtype)
+        self.cache.write(path, timestamps, bid, ask,
+                         meta={'pair': pair, 'year': year, 'month': month, 'fetched_at': fetched_at.isoformat()})
+        manifest = self.manifest(pair)
+        manifest.record(year, month, timestamps, bid, ask, fetched_at)
+        manifest.save()
+        return path
+
+    def run(self, months):
+        # months: iterable of (pair, year, month). Both sides of every month are scheduled independently and
+        # a month shard is written as soon as its second side has been parsed.
+        units = [DownloadUnit(pair, year, month, side) for pair, year, month in months for side in SIDES]
+        pending, written, failed = {}, [], []
+        stats = {'bytes': 0, 'rows': 0}
+        started = time.monotonic()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.download_side, unit): unit for unit in units}
+            for future in concurrent.futures.as_completed(futures):
+                unit = futures[future]
+                key = (unit.pair, unit.year, unit.month)
+                try:
+                    timestamps, prices, size = future.result()
+                except Exception as e:
+                    logging.error(f"Failed to download {unit.side} data for {unit.pair} {unit.year}-{unit.month:02d}: {e}")
+                    failed.append(key)
+                    pending.pop(key, None)
+                    continue
+
+                stats['bytes'] += size
+                stats['rows'] += len(timestamps)
+                if key in failed:
+                    continue
+                sides = pending.setdefault(key, {})
+                sides[unit.side] = (timestamps, prices)
+                if len(sides) == len(SIDES):
+                    del pending[key]
+                    merged = self.merge_sides(sides['bid'], sides['ask'])
+                    self.write_month(unit.pair, unit.year, unit.month, *merged)
+                    written.append(key)
+                    logging.info(f"Stored {unit.pair} {unit.year}-{unit.month:02d} ({len(merged[0])} ticks)")
+
+        elapsed = max(time.monotonic() - started, 1e-9)
+        stats.update(written=sorted(written), failed=sorted(set(failed)), seconds=elapsed,
+                     mb_per_s=stats['bytes'] / 1e6 / elapsed, rows_per_s=stats['rows'] / elapsed)
+        logging.info(f"Downloaded {stats['bytes'] / 1e6:.1f} MB, {stats['rows']} rows in {elapsed:.1f}s "
+                     f"({stats['mb_per_s']:.2f} MB/s, {stats['rows_per_s']:.0f} rows/s)")
+        return stats
@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+import collections
+import concurrent.futures
+
+from .backtest import Backtest
+from .data_manager import DataManager
+from .ledger import Ledger
+from .profiler import Profiler
+from .strategy import Strategy
+from .tick_matrix import TickMatrix
+
+QUEUED = 'queued'
+PREPARING = 'preparing'
+RUNNING = 'running'
+DONE = 'done'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+
+def result_path(folder, params, key):
+    # Result file of a run, named after its parameters and the cache key; shared by the dashboard and the CLI
+    suffix = "" if params['frequency'] == "tick" else f"_{params['frequency']}"
+    return os.path.join(folder, f"backtest_{params['lookback']}_{params['start_year']}_{params['end_year']}{suffix}_{key[:12]}.csv")
+
+class Job:
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex[:8]
+        self.params = params
+        self.status = QUEUED
+        self.stop_event = threading.Event()
+        self.future = None
+        self.backtest = None
+        self.live = None
+        self.results = None
+        self.key = None
+        self.filename = None
+        self.cached = False
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+        self.completed = threading.Event()
+
+    def is_active(self):
+        return self.status in (QUEUED, PREPARING, RUNNING)
+
+    def progress(self):
+        if self.status == DONE:
+            return 1.0
+        backtest = self.backtest
+        if backtest is None or not backtest.total:
+            return 0.0
+        return min(backtest.processed / backtest.total, 1.0)
+
+    def cancel(self):
+        self.stop_event.set()
+        # A job still waiting for a worker never starts; a running one stops at its next tick
+        if self.future is not None and self.future.cancel():
+            self.status = CANCELLED
+            self.finished = time.time()
+            self.completed.set()
+
+    def label(self):
+        params = self.params
+        status = f"{self.status} {self.progress():.0%}" if self.status == RUNNING else self.status
+        cached = ", cached" if self.cached else ""
+        return (f"{self.id}: {','.join(params['assets'])} lookback {params['lookback']} "
+                f"{params['start_year']}-{params['end_year']} {params['frequency']} [{status}{cached}]")
+
+class JobManager:
+    # Data preparation and backtests run on a bounded pool, off the Dash request thread. Finished results are
+    # cached under a hash of the parameters, the asset list and the data manifest, so a repeated run returns
+    # without recomputing, also across restarts through the result files and their parameter sidecars.
+    def __init__(self, folder='backtests', data_folder='data', max_workers=2, max_cached=8):
+        self.folder = folder
+        self.data_folder = data_folder
+        self.max_cached = max_cached
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='backtest')
+        self.jobs = collections.OrderedDict()
+        self.results = collections.OrderedDict()
+        self.computing = {}
+        self.lock = threading.Lock()
+        # Downloads and tick-cache conversion write shared files, so jobs prepare their data one at a time
+        self.data_lock = threading.Lock()
+
+    @staticmethod
+    def job_params(assets, lookback, start_year, end_year, frequency='tick', profile=False):
+        return {'assets': sorted(assets), 'lookback': int(lookback), 'start_year': int(start_year),
+                'end_year': int(end_year), 'frequency': frequency, 'profile': bool(profile)}
+
+    def submit(self, assets, lookback, start_year, end_year, frequency='tick', profile=False):
+        job = Job(self.job_params(assets, lookback, start_year, end_year, frequency, profile))
+        with self.lock:
+            self.jobs[job.id] = job
+        job.future = self.executor.submit(self.run, job)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def list(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def active(self):
+        return [job for job in self.list() if job.is_active()]
+
+    @staticmethod
+    def cache_key(params, data_digest):
+        # Profiling changes how a run is observed, not its results
+        keyed = {name: value for name, value in params.items() if name != 'profile'}
+        payload = json.dumps({'params': keyed, 'data': data_digest}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def result_path(self, params, key):
+        return result_path(self.folder, params, key)
+
+    @staticmethod
+    def sidecar_path(filename):
+        return f"{os.path.splitext(filename)[0]}_params.json"
+
+    def lookup(self, key, filename):
+        with self.lock:
+            if key in self.results:
+                self.results.move_to_end(key)
+                return self.results[key]
+        # The sidecar is only written once a run completed, so a cancelled run's partial file is never reused
+        if os.path.exists(filename) and os.path.exists(self.sidecar_path(filename)):
+            results = Ledger.load(filename)
+            self.remember(key, results)
+            return results
+        return None
+
+    def remember(self, key, results):
+        with self.lock:
+            self.results[key] = results
+            self.results.move_to_end(key)
+            while len(self.results) > self.max_cached:
+                self.results.popitem(last=False)
+
+    def run(self, job):
+        try:
+            self._run(job)
+        except Exception as e:
+            logging.exception(f"Backtest job {job.id} failed")
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            job.finished = time.time()
+            job.completed.set()
+            if job.backtest is not None:
+                # Results live in the ledger and the buffer; the aligned tick matrix is released
+                job.backtest.fx_data = job.backtest.matrix = None
+
+    def _run(self, job):
+        params = job.params
+        if job.stop_event.is_set():
+            job.status = CANCELLED
+            return
+        job.status = PREPARING
+        os.makedirs(self.folder, exist_ok=True)
+        os.makedirs(self.data_folder, exist_ok=True)
+        data_manager = DataManager(fx_pairs=params['assets'], years=range(params['start_year'], params['end_year']),
+                                   folder=self.data_folder)
+        with self.data_lock:
+            data_manager.download_missing_files()
+            data_digest = data_manager.data_digest()
+
+        job.key = self.cache_key(params, data_digest)
+        job.filename = self.result_path(params, job.key)
+        while True:
+            with self.lock:
+                twin = self.computing.setdefault(job.key, job)
+            if twin is job:
+                break
+            # The same run is already in progress and writing to the same file; wait for it and reuse its result
+            twin.completed.wait()
+        try:
+            self._compute(job, data_manager)
+        finally:
+            with self.lock:
+                if self.computing.get(job.key) is job:
+                    del self.computing[job.key]
+
+    def _compute(self, job, data_manager):
+        # live_plot pulls in plotly, which the headless CLI imports this module without needing
+        from .live_plot import CumulativeBuffer
+        params = job.params
+        results = self.lookup(job.key, job.filename)
+        if results is not None:
+            logging.info(f"Backtest job {job.id} served from cache: {job.filename}")
+            job.results = results
+            job.live = CumulativeBuffer.from_frame(params['assets'], results)
+            job.cached = True
+            job.status = DONE
+            return
+        if job.stop_event.is_set():
+            job.status = CANCELLED
+            return
+
+        with self.data_lock:
+            if params['frequency'] == "tick":
+                fx_data = TickMatrix.from_arrays(data_manager.load_fx_arrays())
+            else:
+                fx_data = TickMatrix.from_arrays(data_manager.load_fx_bars(params['frequency']))
+        profiler = Profiler(enabled=params['profile'], sample_interval=0.01)
+        backtest = Backtest(fx_data, Strategy(lookback=params['lookback']), job.filename, job.stop_event,
+                            progress=False, profiler=profiler)
+        backtest.live = CumulativeBuffer(fx_data.pairs)
+        job.live = backtest.live
+        job.backtest = backtest
+        job.status = RUNNING
+        results = backtest.execute()
+
+        if job.stop_event.is_set():
+            job.status = CANCELLED
+            return
+        with open(self.sidecar_path(job.filename), 'w') as f:
+            json.dump({'key': job.key, 'params': params}, f, indent=1)
+        self.remember(job.key, results)
+        job.results = results
+        job.status = DONE
+
+    def shutdown(self):
+        for job in self.active():
+            job.cancel()
+        self.executor.shutdown(wait=False)
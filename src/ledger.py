@@ -0,0 +1,131 @@
+import io
+import os
+import json
+import time
+import numpy as np
+import pandas as pd
+
+class Ledger:
+    def __init__(self, assets, filename=None, flush_rows=1000, flush_seconds=5.0, capacity=1024):
+        self.assets = list(assets)
+        self.filename = filename
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.binary = filename is not None and not filename.endswith('.csv')
+
+        self.timestamps = np.empty(capacity, dtype=np.int64)
+        self.returns = np.zeros((capacity, len(self.assets)))
+        self.size = 0
+        self.flushed = 0
+        self.columns = []
+        self.touched = np.zeros(len(self.assets), dtype=bool)
+        self.last_flush = time.monotonic()
+        self._frame = None
+
+        if self.filename is not None:
+            self._start_file()
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self):
+        capacity = 2 * len(self.timestamps)
+        timestamps = np.empty(capacity, dtype=np.int64)
+        timestamps[:self.size] = self.timestamps[:self.size]
+        returns = np.zeros((capacity, len(self.assets)))
+        returns[:self.size] = self.returns[:self.size]
+        self.timestamps, self.returns = timestamps, returns
+
+    def append(self, timestamp, returns):
+        if self.size == len(self.timestamps):
+            self._grow()
+        row = self.returns[self.size]
+        for col, value in returns.items():
+            if not self.touched[col]:
+                self.touched[col] = True
+                self.columns.append(col)
+            row[col] = 0.0 if value != value else value
+        self.timestamps[self.size] = timestamp
+        self.size += 1
+        self._frame = None
+
+        if self.filename is not None and (self.size - self.flushed >= self.flush_rows or
+                                          time.monotonic() - self.last_flush >= self.flush_seconds):
+            self.flush()
+
+    def extend(self, timestamps, returns, columns):
+        # Bulk append of already-aligned rows; `columns` lists the asset columns in first-touch order
+        while self.size + len(timestamps) > len(self.timestamps):
+            self._grow()
+        self.timestamps[self.size:self.size + len(timestamps)] = timestamps
+        self.returns[self.size:self.size + len(timestamps)] = returns
+        self.size += len(timestamps)
+        for col in columns:
+            if not self.touched[col]:
+                self.touched[col] = True
+                self.columns.append(col)
+        self._frame = None
+        if self.filename is not None:
+            self.flush()
+
+    def to_frame(self):
+        if self._frame is None:
+            index = pd.DatetimeIndex(self.timestamps[:self.size].view('datetime64[ns]'), name='Datetime')
+            self._frame = pd.DataFrame(self.returns[:self.size, self.columns], index=index,
+                                       columns=[self.assets[col] for col in self.columns])
+        return self._frame
+
+    def _record_dtype(self):
+        return np.dtype([('Datetime', '<i8')] + [(asset, '<f8') for asset in self.assets])
+
+    def _start_file(self):
+        os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+        if self.binary:
+            with open(self.filename + '.json', 'w') as f:
+                json.dump({'columns': self.assets}, f)
+            open(self.filename, 'wb').close()
+        else:
+            with open(self.filename, 'w') as f:
+                f.write(','.join(['Datetime'] + self.assets) + '\n')
+
+    def flush(self):
+        # Only rows added since the last flush are appended, then fsynced, so the file always holds a prefix of the run
+        if self.filename is None or self.flushed == self.size:
+            self.last_flush = time.monotonic()
+            return
+        start, stop = self.flushed, self.size
+        if self.binary:
+            records = np.empty(stop - start, dtype=self._record_dtype())
+            records['Datetime'] = self.timestamps[start:stop]
+            for col, asset in enumerate(self.assets):
+                records[asset] = self.returns[start:stop, col]
+            payload = records.tobytes()
+        else:
+            index = pd.DatetimeIndex(self.timestamps[start:stop].view('datetime64[ns]'))
+            chunk = pd.DataFrame(self.returns[start:stop], index=index, columns=self.assets)
+            payload = chunk.to_csv(header=False).encode()
+        with open(self.filename, 'ab') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        self.flushed = stop
+        self.last_flush = time.monotonic()
+
+    @staticmethod
+    def load(filename):
+        if filename.endswith('.csv'):
+            with open(filename, 'rb') as f:
+                content = f.read()
+            # A crash can leave a partially written last line behind
+            content = content[:content.rfind(b'\n') + 1]
+            df = pd.read_csv(io.BytesIO(content), index_col='Datetime', parse_dates=['Datetime'])
+        else:
+            with open(filename + '.json') as f:
+                columns = json.load(f)['columns']
+            dtype = np.dtype([('Datetime', '<i8')] + [(asset, '<f8') for asset in columns])
+            with open(filename, 'rb') as f:
+                content = f.read()
+            records = np.frombuffer(content[:len(content) - len(content) % dtype.itemsize], dtype=dtype)
+            index = pd.DatetimeIndex(records['Datetime'].view('datetime64[ns]'), name='Datetime')
+            df = pd.DataFrame({asset: records[asset] for asset in columns}, index=index)
+        return df
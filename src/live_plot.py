@@ -0,0 +1,169 @@
+import uuid
+import threading
+import numpy as np
+import plotly.graph_objects as go
+
+INDIVIDUAL_TITLE = "Individual Asset Cumulative Returns"
+COMBINED_TITLE = "Combined Portfolio Cumulative Return"
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the visual shape of the line
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        # Too few points for a triangle; the endpoints keep the line anchored without sending the rows between
+        return np.array([n - 1] if threshold < 2 else [0, n - 1], dtype=np.int64)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], max(edges[bucket + 1], edges[bucket] + 1)
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[stop:next_stop].mean() if next_stop > stop else x[-1]
+        next_y = y[stop:next_stop].mean() if next_stop > stop else y[-1]
+        areas = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous]) -
+                       (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+def to_dates(timestamps):
+    return np.datetime_as_string(np.asarray(timestamps, dtype=np.int64).view('datetime64[ns]'), unit='ms').tolist()
+
+class CumulativeBuffer:
+    # Running cumulative returns per asset plus the combined total, written by the backtest thread and
+    # read by Dash callbacks; every access goes through the lock and readers only ever get copies
+    def __init__(self, assets, capacity=4096):
+        self.assets = list(assets)
+        self.run_id = uuid.uuid4().hex
+        self.lock = threading.Lock()
+        self.timestamps = np.empty(capacity, dtype=np.int64)
+        self.cumulative = np.zeros((capacity, len(self.assets) + 1))
+        self.running = np.zeros(len(self.assets) + 1)
+        self.columns = []
+        self.size = 0
+
+    def __len__(self):
+        with self.lock:
+            return self.size
+
+    @classmethod
+    def from_frame(cls, assets, results):
+        # Fills a buffer in one go from a finished ledger frame, e.g. a cached run
+        buffer = cls(assets, capacity=max(len(results), 1))
+        index = {asset: col for col, asset in enumerate(buffer.assets)}
+        columns = [index[asset] for asset in results.columns]
+        returns = np.zeros((len(results), len(buffer.assets) + 1))
+        returns[:, columns] = np.nan_to_num(results.to_numpy(dtype=np.float64))
+        returns[:, -1] = returns[:, :-1].sum(axis=1)
+        np.cumsum(returns, axis=0, out=buffer.cumulative[:len(results)])
+        buffer.timestamps[:len(results)] = results.index.asi8
+        buffer.running = buffer.cumulative[len(results) - 1].copy() if len(results) else buffer.running
+        # A ledger file stores every asset; only the ones that ever booked a return get a trace
+        buffer.columns = [col for col in columns if returns[:, col].any()]
+        buffer.size = len(results)
+        return buffer
+
+    def append(self, timestamp, returns):
+        with self.lock:
+            if self.size == len(self.timestamps):
+                self.timestamps = np.resize(self.timestamps, 2 * len(self.timestamps))
+                self.cumulative = np.resize(self.cumulative, (2 * len(self.cumulative), self.cumulative.shape[1]))
+            for col, value in returns.items():
+                if col not in self.columns:
+                    self.columns.append(col)
+                if value == value:
+                    self.running[col] += value
+                    self.running[-1] += value
+            self.timestamps[self.size] = timestamp
+            self.cumulative[self.size] = self.running
+            self.size += 1
+
+    def snapshot(self, start=0, stop=None):
+        with self.lock:
+            stop = self.size if stop is None else min(stop, self.size)
+            return self.timestamps[start:stop].copy(), self.cumulative[start:stop].copy(), list(self.columns), self.size
+
+    def bounds(self, first, last):
+        # Row range holding timestamps in [first, last]
+        with self.lock:
+            timestamps = self.timestamps[:self.size]
+            return int(np.searchsorted(timestamps, first)), int(np.searchsorted(timestamps, last, side='right'))
+
+class LivePlot:
+    # The browser holds a downsampled copy of the curves. Interval ticks append only the rows that arrived
+    # since the last update through extendData, thinned to the current rows-per-point stride; once the client
+    # holds twice the point budget, or the user zooms, the view is redrawn at the budget for the visible range.
+    def __init__(self, points=2000):
+        self.points = points
+
+    @staticmethod
+    def empty_figure(title):
+        figure = go.Figure()
+        figure.update_layout(title={"text": title, "y": 0.95, "x": 0.5, "xanchor": "center", "yanchor": "top"},
+                             margin=dict(l=20, r=20, t=50, b=20), showlegend=True, uirevision="live")
+        return figure
+
+    def figures(self, timestamps, cumulative, columns, assets):
+        individual = self.empty_figure(INDIVIDUAL_TITLE)
+        combined = self.empty_figure(COMBINED_TITLE)
+        for col in columns:
+            rows = lttb(timestamps, cumulative[:, col], self.points)
+            individual.add_trace(go.Scatter(x=to_dates(timestamps[rows]), y=cumulative[rows, col], mode="lines", name=assets[col]))
+        rows = lttb(timestamps, cumulative[:, -1], self.points)
+        combined.add_trace(go.Scatter(x=to_dates(timestamps[rows]), y=cumulative[rows, -1], mode="lines", name="portfolio"))
+        return individual, combined
+
+    def render(self, buffer, zoom=None):
+        if zoom is None:
+            start, stop = 0, None
+        else:
+            start, stop = buffer.bounds(*zoom)
+        timestamps, cumulative, columns, size = buffer.snapshot(start, stop)
+        individual, combined = self.figures(timestamps, cumulative, columns, buffer.assets)
+        state = {'run': buffer.run_id, 'sent': size if zoom is None else stop, 'columns': columns, 'zoom': zoom,
+                 'stride': max(len(timestamps) / self.points, 1.0), 'points': min(len(timestamps), self.points)}
+        return individual, combined, state
+
+    def extend(self, buffer, state):
+        # None means the client copy cannot be extended and must be redrawn
+        timestamps, cumulative, columns, size = buffer.snapshot(state['sent'])
+        if columns != state['columns']:
+            return None
+        if not len(timestamps):
+            return None, None, state
+        count = max(int(np.ceil(len(timestamps) / state['stride'])), 1)
+
+        xs, ys = [], []
+        for col in columns + [-1]:
+            rows = lttb(timestamps, cumulative[:, col], count)
+            if len(rows) and rows[-1] != len(timestamps) - 1:
+                rows = np.r_[rows, len(timestamps) - 1]
+            xs.append(to_dates(timestamps[rows]))
+            ys.append(cumulative[rows, col].tolist())
+        # The last row is always sent, so a delta can carry one point more than `count`
+        sent = max(len(x) for x in xs)
+        if state['points'] + sent > 2 * self.points:
+            return None
+        traces = len(columns)
+        individual = ({'x': xs[:traces], 'y': ys[:traces]}, list(range(traces))) if traces else None
+        combined = ({'x': xs[-1:], 'y': ys[-1:]}, [0])
+        state = dict(state, sent=size, points=state['points'] + sent)
+        return individual, combined, state
+
+    @staticmethod
+    def zoom_range(relayout):
+        # ('range', (first_ns, last_ns)) for a zoom, ('reset', None) for autoscale, None for unrelated relayouts
+        if not relayout:
+            return None
+        if relayout.get('xaxis.autorange'):
+            return 'reset', None
+        if 'xaxis.range[0]' in relayout and 'xaxis.range[1]' in relayout:
+            first, last = (np.datetime64(relayout[key].replace(' ', 'T'), 'ns').astype(np.int64).item()
+                           for key in ('xaxis.range[0]', 'xaxis.range[1]'))
+            return 'range', (first, last)
+        return None
@@ -0,0 +1,62 @@
+import os
+import json
+import hashlib
+from datetime import datetime, timezone
+import numpy as np
+
+class Manifest:
+    def __init__(self, folder, pair):
+        self.pair = pair
+        self.path = os.path.join(folder, pair, 'manifest.json')
+        self.months = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.months = json.load(f).get('months', {})
+
+    @staticmethod
+    def key(year, month):
+        return f'{year}-{month:02d}'
+
+    @staticmethod
+    def checksum(timestamps, bid, ask):
+        digest = hashlib.sha256()
+        for array in (timestamps, bid, ask):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def month_end(year, month):
+        if month == 12:
+            return datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+        return datetime(year, month + 1, 1, tzinfo=timezone.utc)
+
+    def entry(self, year, month):
+        return self.months.get(self.key(year, month))
+
+    def record(self, year, month, timestamps, bid, ask, fetched_at=None):
+        fetched_at = fetched_at or datetime.now(timezone.utc)
+        self.months[self.key(year, month)] = {
+            'rows': int(len(timestamps)),
+            'start': int(timestamps[0]) if len(timestamps) else None,
+            'end': int(timestamps[-1]) if len(timestamps) else None,
+            'checksum': self.checksum(timestamps, bid, ask),
+            'fetched_at': fetched_at.isoformat(),
+            # A month fetched before it ended only holds part of its ticks and must be topped up later
+            'complete': fetched_at >= self.month_end(year, month),
+        }
+
+    def is_current(self, year, month, rows=None):
+        entry = self.entry(year, month)
+        if entry is None or not entry['complete']:
+            return False
+        return rows is None or rows == entry['rows']
+
+    def verify(self, year, month, timestamps, bid, ask):
+        entry = self.entry(year, month)
+        return entry is not None and entry['checksum'] == self.checksum(timestamps, bid, ask)
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'pair': self.pair, 'months': dict(sorted(self.months.items()))}, f, indent=1)
+        os.replace(tmp_path, self.path)
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from .direction import Direction
 
-@dataclass
+@dataclass(slots=True)
 class Order:
     asset: str
     price: float
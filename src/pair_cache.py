@@ -0,0 +1,67 @@
+import numpy as np
+
+class PairCache:
+    def __init__(self, assets, retest_ticks=None, retest_seconds=None, drift_threshold=None):
+        self.assets = list(assets)
+        self.retest_ticks = retest_ticks
+        self.retest_seconds = retest_seconds
+        self.drift_threshold = drift_threshold
+
+        self.left, self.right = np.triu_indices(len(self.assets), k=1)
+
+        count = len(self.left)
+        self.hedge_ratio = np.full(count, np.nan)
+        self.intercept = np.full(count, np.nan)
+        self.p_value = np.full(count, np.nan)
+        self.residual_std = np.full(count, np.nan)
+        self.tested_tick = np.full(count, -1, dtype=np.int64)
+        self.tested_at = np.full(count, np.iinfo(np.int64).min, dtype=np.int64)
+
+        self.hits = 0
+        self.misses = 0
+
+    def is_enabled(self):
+        return any(rule is not None for rule in (self.retest_ticks, self.retest_seconds, self.drift_threshold))
+
+    def stale(self, valid, latest, tick, timestamp=None):
+        candidates = valid[self.left] & valid[self.right]
+        if not self.is_enabled():
+            return candidates
+
+        stale = self.tested_tick < 0
+        if self.retest_ticks is not None:
+            stale |= tick - self.tested_tick >= self.retest_ticks
+        if self.retest_seconds is not None and timestamp is not None:
+            stale |= timestamp - self.tested_at >= int(self.retest_seconds * 1e9)
+        if self.drift_threshold is not None:
+            spread = latest[self.left] - self.hedge_ratio * latest[self.right] - self.intercept
+            with np.errstate(invalid='ignore'):
+                stale |= np.abs(spread) > self.drift_threshold * self.residual_std
+        return candidates & stale
+
+    def update(self, tested, hedge_ratio, intercept, p_value, residual_std, tick, timestamp=None):
+        self.hedge_ratio[tested] = hedge_ratio
+        self.intercept[tested] = intercept
+        self.p_value[tested] = p_value
+        self.residual_std[tested] = residual_std
+        self.tested_tick[tested] = tick
+        if timestamp is not None:
+            self.tested_at[tested] = timestamp
+
+    def invalidate(self, pairs):
+        self.tested_tick[pairs] = -1
+
+    def record(self, candidates, tested):
+        self.misses += int(tested.size)
+        self.hits += int(candidates) - int(tested.size)
+
+    def cointegrated(self, valid, significance, selected=None):
+        with np.errstate(invalid='ignore'):
+            mask = valid[self.left] & valid[self.right] & (self.p_value < significance)
+        if selected is not None:
+            mask &= selected
+        return self.left[mask], self.right[mask]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,81 @@
+import numpy as np
+
+class PairScreen:
+    def __init__(self, assets, top_k=None, threshold=None, refresh_ticks=100, audit_ticks=None):
+        self.assets = list(assets)
+        self.top_k = top_k
+        self.threshold = threshold
+        self.refresh_ticks = refresh_ticks
+        self.audit_ticks = audit_ticks
+
+        self.left, self.right = np.triu_indices(len(self.assets), k=1)
+        self.score = np.full(len(self.left), np.nan)
+        self.selected = np.ones(len(self.left), dtype=bool)
+        self.refreshed_tick = None
+        self.audited_tick = None
+
+        self.refreshes = 0
+        self.candidates = 0
+        self.skipped = 0
+        self.audits = 0
+        self.audited = 0
+        self.missed = 0
+
+    def is_enabled(self):
+        return self.top_k is not None or self.threshold is not None
+
+    def due(self, tick):
+        return self.refreshed_tick is None or tick - self.refreshed_tick >= self.refresh_ticks
+
+    def refresh(self, prices, valid, tick):
+        # Ranks every pair by |correlation| of log mid-prices over the window, one N x N product for all pairs.
+        # Returns the pairs that just entered the selection, whose cached test results may be out of date.
+        with np.errstate(divide='ignore', invalid='ignore'):
+            logs = np.log(prices)
+            centered = logs - logs.mean(axis=0)
+            norms = np.sqrt(np.einsum('ij,ij->j', centered, centered))
+            correlation = (centered.T @ centered) / np.outer(norms, norms)
+        score = np.abs(correlation[self.left, self.right])
+        score[~(valid[self.left] & valid[self.right]) | ~np.isfinite(score)] = -np.inf
+        self.score = score
+
+        selected = np.isfinite(score)
+        if self.threshold is not None:
+            selected &= score >= self.threshold
+        if self.top_k is not None and selected.sum() > self.top_k:
+            ranked = np.where(selected, score, -np.inf)
+            keep = np.argpartition(ranked, -self.top_k)[-self.top_k:]
+            selected = np.zeros_like(selected)
+            selected[keep] = True
+
+        entered = selected & ~self.selected
+        self.selected = selected
+        self.refreshed_tick = tick
+        self.refreshes += 1
+        return entered
+
+    def record(self, candidates):
+        self.candidates += int(candidates.sum())
+        self.skipped += int((candidates & ~self.selected).sum())
+
+    def audit_due(self, tick):
+        return self.audit_ticks is not None and (self.audited_tick is None or tick - self.audited_tick >= self.audit_ticks)
+
+    def record_audit(self, tick, dropped, kept):
+        # `kept` of the `dropped` pairs passed the full test, so the screen cost those trades
+        self.audited_tick = tick
+        self.audits += 1
+        self.audited += int(dropped)
+        self.missed += int(kept)
+
+    def stats(self):
+        return {
+            'refreshes': self.refreshes,
+            'candidates': self.candidates,
+            'skipped': self.skipped,
+            'work_saved': self.skipped / self.candidates if self.candidates else 0.0,
+            'audits': self.audits,
+            'audited': self.audited,
+            'missed': self.missed,
+            'miss_rate': self.missed / self.audited if self.audited else 0.0,
+        }
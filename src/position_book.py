@@ -0,0 +1,113 @@
+import numpy as np
+
+from .direction import Direction
+from .order import Order
+
+FILL_DTYPE = np.dtype([
+    ('timestamp', np.int64),
+    ('pair', np.int64),
+    ('asset', np.int64),
+    ('side', np.int8),
+    ('price', np.float64),
+    ('quantity', np.int64),
+    ('closing', np.bool_),
+    ('realized', np.float64),
+])
+
+class FillLedger:
+    def __init__(self, capacity=1024):
+        self.fills = np.empty(capacity, dtype=FILL_DTYPE)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def extend(self, fills):
+        while self.size + len(fills) > len(self.fills):
+            grown = np.empty(2 * len(self.fills), dtype=FILL_DTYPE)
+            grown[:self.size] = self.fills[:self.size]
+            self.fills = grown
+        self.fills[self.size:self.size + len(fills)] = fills
+        self.size += len(fills)
+
+    def to_array(self):
+        return self.fills[:self.size].copy()
+
+    def orders(self, assets):
+        # Materialises the fills as Order records, for inspection; the trading path stays on the arrays
+        return [Order(asset=assets[fill['asset']], price=float(fill['price']),
+                      direction=Direction.BUY if fill['side'] > 0 else Direction.SELL, quantity=int(fill['quantity']))
+                for fill in self.fills[:self.size]]
+
+class PositionBook:
+    def __init__(self, assets):
+        # Every state array is indexed by pair id, the position of (left, right) in np.triu_indices order,
+        # the same numbering PairCache and PairScreen use. Leg 0 is the lower asset index.
+        self.assets = list(assets)
+        count = len(self.assets) * (len(self.assets) - 1) // 2
+        self.position = np.zeros(count, dtype=np.int8)
+        self.legs = np.zeros((count, 2), dtype=np.int8)
+        self.entry_price = np.full((count, 2), np.nan)
+        self.hedge_ratio = np.full(count, np.nan)
+        self.fills = FillLedger()
+
+    def pair_ids(self, left, right):
+        n = len(self.assets)
+        return left * (2 * n - left - 1) // 2 + (right - left - 1)
+
+    def asset_positions(self):
+        # Net per-asset exposure summed over every open pair
+        net = np.zeros(len(self.assets), dtype=np.int64)
+        left, right = np.triu_indices(len(self.assets), k=1)
+        np.add.at(net, left, self.legs[:, 0])
+        np.add.at(net, right, self.legs[:, 1])
+        return net
+
+    def is_flat(self):
+        return not self.position.any()
+
+    def state(self):
+        return self.position.copy(), self.legs.copy(), self.entry_price.copy(), self.hedge_ratio.copy()
+
+    def restore(self, state):
+        position, legs, entry_price, hedge_ratio = state
+        self.position = position.copy()
+        self.legs = legs.copy()
+        self.entry_price = entry_price.copy()
+        self.hedge_ratio = hedge_ratio.copy()
+
+    def execute(self, timestamp, pairs, left, right, target, prices, hedge_ratio=None):
+        # Moves every pair in `pairs` to its `target` position in one batch and returns the fills, two per pair,
+        # leg 0 first. A position of +1 is long the left leg and short the right one. Closing legs carry their
+        # percent return against the entry price in `realized`, NaN when either price is missing.
+        current = self.position[pairs]
+        opening = target != 0
+        sign = np.where(opening, target, -current)
+
+        fills = np.empty(2 * len(pairs), dtype=FILL_DTYPE)
+        fills['timestamp'] = 0 if timestamp is None else timestamp
+        fills['pair'] = np.repeat(pairs, 2)
+        fills['asset'] = np.stack([left, right], axis=1).ravel()
+        fills['side'] = np.stack([sign, -sign], axis=1).ravel()
+        fills['price'] = prices[fills['asset']]
+        fills['quantity'] = 1
+        fills['closing'] = np.repeat(~opening, 2)
+
+        entry = self.entry_price[pairs].ravel()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # A closing fill unwinds a leg held with the opposite side
+            realized = -fills['side'] * (fills['price'] - entry) / entry * 100
+        fills['realized'] = np.where(fills['closing'], realized, np.nan)
+
+        self.position[pairs] = target
+        self.legs[pairs] = np.stack([target, -target], axis=1)
+        opened = pairs[opening]
+        self.entry_price[opened] = fills['price'].reshape(-1, 2)[opening]
+        if hedge_ratio is not None:
+            self.hedge_ratio[opened] = hedge_ratio[opening]
+        closed = pairs[~opening]
+        self.entry_price[closed] = np.nan
+        self.hedge_ratio[closed] = np.nan
+
+        self.fills.extend(fills)
+        return fills
@@ -0,0 +1,166 @@
+import sys
+import json
+import time
+import threading
+import tracemalloc
+import collections
+import numpy as np
+
+class StageStats:
+    # Timings in nanoseconds; histogram bin b counts calls that took [2^(b-1), 2^b) ns
+    __slots__ = ('count', 'total', 'min', 'max', 'histogram', 'allocated', 'allocating_calls')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.histogram = np.zeros(64, dtype=np.int64)
+        self.allocated = 0
+        self.allocating_calls = 0
+
+    def add(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        if self.min is None or elapsed < self.min:
+            self.min = elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.histogram[min(elapsed.bit_length(), 63)] += 1
+
+    def percentile(self, q):
+        # Upper edge of the histogram bin holding the q-th percentile, good to within a factor of two
+        if not self.count:
+            return 0
+        return 1 << int(np.searchsorted(np.cumsum(self.histogram), q / 100 * self.count))
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_s': self.total / 1e9,
+            'mean_us': self.total / self.count / 1e3 if self.count else 0.0,
+            'min_us': (self.min or 0) / 1e3,
+            'p50_us': self.percentile(50) / 1e3,
+            'p99_us': self.percentile(99) / 1e3,
+            'max_us': self.max / 1e3,
+            'histogram_log2_ns': {int(b): int(n) for b, n in enumerate(self.histogram) if n},
+            'allocated_bytes': self.allocated,
+            'allocating_calls': self.allocating_calls,
+        }
+
+class NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_STAGE = NullStage()
+
+class Stage:
+    # One reusable timer per stage name; stages are entered from the single thread driving the backtest
+    __slots__ = ('profiler', 'stats', 'started', 'memory')
+
+    def __init__(self, profiler, stats):
+        self.profiler = profiler
+        self.stats = stats
+        self.started = 0
+        self.memory = 0
+
+    def __enter__(self):
+        if self.profiler.track_allocations:
+            self.memory = tracemalloc.get_traced_memory()[0]
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.add(time.perf_counter_ns() - self.started)
+        if self.profiler.track_allocations:
+            grown = tracemalloc.get_traced_memory()[0] - self.memory
+            if grown > 0:
+                self.stats.allocated += grown
+                self.stats.allocating_calls += 1
+        return False
+
+class Profiler:
+    def __init__(self, enabled=False, track_allocations=False, sample_interval=None, sample_depth=32):
+        self.enabled = enabled
+        self.track_allocations = enabled and track_allocations
+        self.sample_interval = sample_interval if enabled else None
+        self.sample_depth = sample_depth
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.timers = {}
+        self.samples = collections.Counter()
+        self.stacks = collections.Counter()
+        self.started_at = None
+        self.elapsed = 0.0
+        self._sampler = None
+        self._stop_sampling = threading.Event()
+
+    def stage(self, name):
+        # Disabled profiling costs one attribute check and hands back a shared no-op context manager
+        if not self.enabled:
+            return NULL_STAGE
+        timer = self.timers.get(name)
+        if timer is None:
+            with self.lock:
+                self.stages[name] = StageStats()
+                timer = self.timers[name] = Stage(self, self.stages[name])
+        return timer
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.started_at = time.perf_counter()
+        self.elapsed = 0.0
+        if self.track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.sample_interval:
+            self._stop_sampling.clear()
+            self._sampler = threading.Thread(target=self._sample, args=(threading.get_ident(),), daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        if not self.enabled or self.started_at is None:
+            return
+        self.elapsed = time.perf_counter() - self.started_at
+        if self._sampler is not None:
+            self._stop_sampling.set()
+            self._sampler.join()
+            self._sampler = None
+        if self.track_allocations and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _sample(self, thread_id):
+        # Statistical profiler: periodically records the profiled thread's leaf function and collapsed stack
+        while not self._stop_sampling.wait(self.sample_interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.sample_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            with self.lock:
+                self.samples[stack[0]] += 1
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def snapshot(self):
+        with self.lock:
+            stages = {name: stats.to_dict() for name, stats in self.stages.items()}
+            samples = self.samples.most_common(50)
+            stacks = self.stacks.most_common(200)
+        elapsed = self.elapsed or (time.perf_counter() - self.started_at if self.started_at is not None else 0.0)
+        return {
+            'enabled': self.enabled,
+            'elapsed_s': elapsed,
+            'stages': stages,
+            'samples': [{'frame': frame, 'count': count} for frame, count in samples],
+            'stacks': [{'stack': stack, 'count': count} for stack, count in stacks],
+        }
+
+    def export(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=1)
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+class RollingWindow:
+    def __init__(self, size, columns):
+        self.size = size
+        self.columns = list(columns)
+        width = len(self.columns)
+
+        # Every row is written twice so the last `size` rows are always one contiguous slice
+        self.buffer = np.full((2 * size, width), np.nan)
+        self.last = np.full(width, np.nan)
+        self.count = 0
+        self.head = 0
+
+        # Running sums are kept around a per-column shift to avoid cancellation on raw price levels
+        self.shift = np.zeros(width)
+        self.sum = np.zeros(width)
+        self.cross = np.zeros((width, width))
+        self.nan_count = np.zeros(width, dtype=np.int64)
+        self.pushes_since_rebase = 0
+
+        self._mask = np.zeros(width, dtype=bool)
+        self._evicted_nans = np.zeros(width, dtype=bool)
+        self._centered = np.zeros(width)
+        self._outer = np.zeros((width, width))
+        self._scratch = np.zeros((size, width))
+        self._mean = np.zeros(width)
+        self._deviation = np.zeros(width)
+        self._var = np.zeros((width, width))
+        self._tmp = np.zeros((width, width))
+        self.z_scores = np.zeros((width, width))
+
+        self._diag = np.diagonal(self.cross)
+        self._diag_row, self._diag_col = self._diag[None, :], self._diag[:, None]
+        self._mean_row, self._mean_col = self._mean[None, :], self._mean[:, None]
+        self._dev_row, self._dev_col = self._deviation[None, :], self._deviation[:, None]
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def is_full(self):
+        return self.count >= self.size
+
+    def values(self):
+        start = self.head if self.is_full() else 0
+        return self.buffer[start:start + len(self)]
+
+    def latest(self):
+        return self.last
+
+    def to_frame(self):
+        return pd.DataFrame(self.values(), columns=self.columns)
+
+    def seed(self, values):
+        # Starts the forward-fill from prices seen before the window's first row
+        np.copyto(self.last, values)
+
+    def push(self, values):
+        np.isnan(values, out=self._mask)
+        np.logical_not(self._mask, out=self._mask)
+        np.copyto(self.last, values, where=self._mask)
+
+        warming_up = False
+        if self.is_full():
+            evicted = self.buffer[self.head]
+            self._accumulate(evicted, -1)
+            if self.nan_count.any():
+                np.isnan(evicted, out=self._evicted_nans)
+                self.nan_count -= self._evicted_nans
+                warming_up = True
+
+        self.buffer[self.head] = self.last
+        self.buffer[self.head + self.size] = self.last
+        self.head = (self.head + 1) % self.size
+        self.count += 1
+
+        self._accumulate(self.last, 1)
+        np.isnan(self.last, out=self._mask)
+        if self._mask.any():
+            self.nan_count += self._mask
+
+        self.pushes_since_rebase += 1
+        # A column leaving its warm-up carries NaN in its sums, so those are rebuilt exactly
+        if self.pushes_since_rebase >= self.size or (warming_up and np.any(self._evicted_nans & (self.nan_count == 0))):
+            self.rebase()
+
+    def _accumulate(self, row, sign):
+        np.subtract(row, self.shift, out=self._centered)
+        np.multiply.outer(self._centered, self._centered, out=self._outer)
+        if sign > 0:
+            self.sum += self._centered
+            self.cross += self._outer
+        else:
+            self.sum -= self._centered
+            self.cross -= self._outer
+
+    def rebase(self):
+        window = self.values()
+        np.isnan(self.last, out=self._mask)
+        np.logical_not(self._mask, out=self._mask)
+        np.copyto(self.shift, self.last, where=self._mask)
+        scratch = self._scratch[:len(window)]
+        np.subtract(window, self.shift, out=scratch)
+        np.sum(scratch, axis=0, out=self.sum)
+        np.dot(scratch.T, scratch, out=self.cross)
+        self.pushes_since_rebase = 0
+
+    def spread_z_scores(self):
+        # z[i, j] of the spread p_j - p_i, identical to mean/var over the full lookback x N x N spread matrix
+        n = len(self)
+        np.divide(self.sum, n, out=self._mean)
+        np.subtract(self.last, self.shift, out=self._deviation)
+        self._deviation -= self._mean
+
+        np.add(self._diag_row, self._diag_col, out=self._var)
+        np.multiply(self.cross, 2, out=self._tmp)
+        self._var -= self._tmp
+        self._var /= n
+        np.subtract(self._mean_row, self._mean_col, out=self._tmp)
+        np.square(self._tmp, out=self._tmp)
+        self._var -= self._tmp
+        np.maximum(self._var, 0, out=self._var)
+        np.sqrt(self._var, out=self._var)
+        self._var += 1e-8
+
+        np.subtract(self._dev_row, self._dev_col, out=self.z_scores)
+        np.divide(self.z_scores, self._var, out=self.z_scores)
+        return self.z_scores
@@ -0,0 +1,161 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+import concurrent.futures
+import numpy as np
+
+from .backtest import Backtest
+from .ledger import Ledger
+from .position_book import FILL_DTYPE
+from .strategy import Strategy
+from .tick_matrix import TickMatrix
+
+def plan_shards(rows, shards, warmup):
+    bounds = np.linspace(0, rows, shards + 1).astype(int)
+    return [(int(start), int(stop), max(int(start) - warmup, 0)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+def primed_backtest(matrix, strategy_params, start, warmup_start):
+    # A fresh strategy is forward-filled from before the warm-up and fed warm-up ticks without trading,
+    # so its lookback window at `start` matches that of a run that began at row 0
+    backtest = Backtest(matrix, Strategy(**strategy_params), None, None, progress=False)
+    backtest.prepare(matrix)
+    backtest.strategy.window.seed(matrix.last_valid_mid(warmup_start))
+    for row in range(warmup_start, start):
+        backtest.strategy.prime(matrix.mid[row], matrix.timestamps[row])
+    return backtest
+
+def segment(backtest):
+    return {'fills': backtest.strategy.book.fills.to_array(), 'state': backtest.position_state()}
+
+def run_shard(matrix_path, strategy_params, start, stop, warmup_start):
+    matrix = TickMatrix.load(matrix_path)
+    backtest = primed_backtest(matrix, strategy_params, start, warmup_start)
+    backtest.run_rows(start, stop)
+    return segment(backtest)
+
+def sort_fills(fills):
+    # The order Strategy emits them in: by tick, then pair id, then leg (the lower asset index first)
+    return fills[np.lexsort((fills['asset'], fills['pair'], fills['timestamp']))]
+
+def ledger_rows(fills, n_assets):
+    # The rows Backtest.handle_orders books for these fills: one per tick that traded, closing legs' returns
+    # summed per asset with NaN as 0, and columns in first-touch order
+    timestamps, row = np.unique(fills['timestamp'], return_inverse=True)
+    closing = fills[fills['closing']]
+    returns = np.zeros((len(timestamps), n_assets))
+    np.add.at(returns, (row[fills['closing']], closing['asset']), np.nan_to_num(closing['realized']))
+    _, first = np.unique(closing['asset'], return_index=True)
+    return timestamps, returns, closing['asset'][np.sort(first)].tolist()
+
+def merge_state(state, replay_state, pairs):
+    merged = tuple(array.copy() for array in state)
+    for array, replayed in zip(merged, replay_state):
+        array[pairs] = replayed[pairs]
+    return merged
+
+class ShardedBacktest:
+    def __init__(self, matrix, strategy_params=None, shards=None, workers=None, warmup=None, filename=None):
+        self.matrix = matrix
+        self.strategy_params = strategy_params or {}
+        self.workers = workers or os.cpu_count()
+        self.shards = shards or self.workers
+        lookback = self.strategy_params.get('lookback', Strategy().lookback)
+        self.warmup = max(warmup or lookback, lookback)
+        self.filename = filename
+        self.reconciled_rows = 0
+        self.fills = None
+
+    def reconcile(self, shard, start, stop, warmup_start, state):
+        # The shard ran from a flat book. Each pair trades only on its own position and prices, so the pairs that
+        # were flat at the boundary are already right. Only the pairs open there are replayed, from the inherited
+        # book, each until the replay and the shard run are both flat after the same row; from there on the
+        # shard's fills for that pair are reused.
+        pending = np.flatnonzero(state[0])
+        if not len(pending):
+            return shard
+        timestamps = self.matrix.timestamps
+        shard_fills = shard['fills']
+        # Leg-0 fills tell whether a pair is flat after them: an opening fill leaves it open, a closing one flat
+        legs = shard_fills[np.isin(shard_fills['pair'], pending) & (np.arange(len(shard_fills)) % 2 == 0)]
+        shard_legs = {pair: legs[legs['pair'] == pair] for pair in pending.tolist()}
+        cutoff = {pair: np.iinfo(np.int64).max for pair in pending.tolist()}
+
+        backtest = primed_backtest(self.matrix, self.strategy_params, start, warmup_start)
+        backtest.restore_position_state(state)
+        strategy = backtest.strategy
+        strategy.restrict(pending)
+        for row in range(start, stop):
+            backtest.run_rows(row, row + 1)
+            self.reconciled_rows += 1
+            converged = []
+            for pair in pending[strategy.book.position[pending] == 0].tolist():
+                fills = shard_legs[pair]
+                done = np.searchsorted(fills['timestamp'], timestamps[row], side='right')
+                if not done or fills['closing'][done - 1]:
+                    converged.append(pair)
+                    cutoff[pair] = timestamps[row]
+            if converged:
+                pending = np.setdiff1d(pending, converged)
+                if not len(pending):
+                    break
+                strategy.restrict(pending)
+
+        replay_fills = strategy.book.fills.to_array()
+        replay_limit = np.array([cutoff.get(pair, -1) for pair in replay_fills['pair'].tolist()], dtype=np.int64)
+        shard_limit = np.array([cutoff.get(pair, np.iinfo(np.int64).min) for pair in shard_fills['pair'].tolist()], dtype=np.int64)
+        fills = np.concatenate([replay_fills[replay_fills['timestamp'] <= replay_limit],
+                                shard_fills[shard_fills['timestamp'] > shard_limit]])
+        return {'fills': sort_fills(fills), 'state': merge_state(shard['state'], backtest.position_state(), pending)}
+
+    def execute(self):
+        plan = plan_shards(len(self.matrix), self.shards, self.warmup)
+        self.reconciled_rows = 0
+        work_folder = tempfile.mkdtemp(prefix='shards_')
+        try:
+            matrix_path = os.path.join(work_folder, 'matrix')
+            self.matrix.save(matrix_path)
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(run_shard, matrix_path, self.strategy_params, *bounds) for bounds in plan]
+                results = [future.result() for future in futures]
+        finally:
+            shutil.rmtree(work_folder, ignore_errors=True)
+
+        fills, state = [], None
+        for (start, stop, warmup_start), shard in zip(plan, results):
+            if state is not None:
+                shard = self.reconcile(shard, start, stop, warmup_start, state)
+            fills.append(shard['fills'])
+            state = shard['state']
+        self.fills = np.concatenate(fills) if fills else np.empty(0, dtype=FILL_DTYPE)
+
+        ledger = Ledger(self.matrix.pairs, self.filename)
+        ledger.extend(*ledger_rows(self.fills, len(self.matrix.pairs)))
+        logging.info(f"Sharded backtest: {len(plan)} shards, {self.reconciled_rows} rows replayed at boundaries")
+        self.ledger = ledger
+        return ledger.to_frame()
+
+    def verify(self):
+        started = time.perf_counter()
+        sharded = self.execute()
+        sharded_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        backtest = Backtest(self.matrix, Strategy(**self.strategy_params), None, None, progress=False)
+        sequential = backtest.execute()
+        sequential_seconds = time.perf_counter() - started
+        columns = sorted(set(sharded.columns) | set(sequential.columns))
+        left = sharded.reindex(columns=columns, fill_value=0.0)
+        right = sequential.reindex(columns=columns, fill_value=0.0)
+        same_index = left.index.equals(right.index)
+        report = {
+            'sharded_rows': len(left),
+            'sequential_rows': len(right),
+            'mismatched_timestamps': len(left.index.symmetric_difference(right.index)),
+            'max_abs_diff': float(np.abs(left.to_numpy() - right.to_numpy()).max(initial=0.0)) if same_index else np.nan,
+            'reconciled_rows': self.reconciled_rows,
+            'sharded_seconds': sharded_seconds,
+            'sequential_seconds': sequential_seconds,
+            'speedup': sequential_seconds / sharded_seconds if sharded_seconds > 0 else np.inf,
+        }
+        return report, sharded, sequential
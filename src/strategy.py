@@ -1,92 +1,172 @@
-import pandas as pd
 import numpy as np
-from statsmodels.tsa.stattools import adfuller
-import warnings
-import pandas as pd
-warnings.filterwarnings("ignore", category=RuntimeWarning, message="divide by zero encountered in log")
 
-from .direction import Direction
-from .order import Order
+from .cointegration import engle_granger
+from .pair_cache import PairCache
+from .pair_screen import PairScreen
+from .position_book import PositionBook
+from .profiler import Profiler
+from .rolling_window import RollingWindow
 
 class Strategy:
-    def __init__(self, significance=0.025, lookback=30):
+    def __init__(self, significance=0.025, lookback=30, adf_lags=None, retest_ticks=None, retest_seconds=None, retest_drift=None, pairs=None,
+                 screen_top_k=None, screen_threshold=None, screen_refresh=100, screen_audit=None):
         self.significance = significance
         self.lookback = lookback
-        self.prices = {}
-        self.orders = {}
-        self.price_df = pd.DataFrame()
-        self.positions_df = pd.DataFrame()
+        self.adf_lags = adf_lags
+        self.retest_ticks = retest_ticks
+        self.retest_seconds = retest_seconds
+        self.retest_drift = retest_drift
+        self.pairs = pairs
+        self.screen_top_k = screen_top_k
+        self.screen_threshold = screen_threshold
+        self.screen_refresh = screen_refresh
+        self.screen_audit = screen_audit
+        self.fixed_pairs = None
+        self.restricted = None
+        self.assets = []
+        self.ticks = 0
+        self.timestamp = None
+        self.window = RollingWindow(lookback, [])
+        self.pair_cache = PairCache([])
+        self.pair_screen = PairScreen([])
+        self.book = PositionBook([])
+        self.profiler = Profiler()
     
+    def set_assets(self, assets):
+        self.assets = list(assets)
+        self.window = RollingWindow(self.lookback, self.assets)
+        self.pair_cache = PairCache(self.assets, self.retest_ticks, self.retest_seconds, self.retest_drift)
+        self.pair_screen = PairScreen(self.assets, self.screen_top_k, self.screen_threshold, self.screen_refresh, self.screen_audit)
+        self.book = PositionBook(self.assets)
+        if self.pairs is not None:
+            self.fixed_pairs = self.pair_indices(self.assets, self.pairs)
+
+    @staticmethod
+    def pair_indices(assets, pairs):
+        # Fixed pairs are oriented and ordered like the cointegration scan, lower asset index first
+        index = {asset: col for col, asset in enumerate(assets)}
+        pairs = sorted({tuple(sorted((index[a], index[b]))) for a, b in pairs})
+        return np.array(pairs, dtype=np.int64).reshape(-1, 2)
+
+    def cache_stats(self):
+        return self.pair_cache.stats()
+
+    def screen_stats(self):
+        return self.pair_screen.stats()
+
+    def prime(self, mid, timestamp=None):
+        # Warm-up ticks fill the lookback window without evaluating or trading any pair
+        self.window.push(mid)
+        self.ticks += 1
+        self.timestamp = timestamp
+
+    def restrict(self, pairs=None):
+        # Limits testing and trading to these pair ids; every pair's decisions depend only on its own position
+        # and prices, so the others can be skipped without changing the trades of the ones kept
+        if pairs is None:
+            self.restricted = None
+            return
+        self.restricted = np.zeros(len(self.pair_cache.left), dtype=bool)
+        self.restricted[pairs] = True
+
+    def is_flat(self):
+        return self.book.is_flat()
+
+    def position_state(self):
+        return self.book.state()
+
+    def restore_position_state(self, state):
+        self.book.restore(state)
+
+    @property
+    def price_df(self):
+        return self.window.to_frame()
+
     def check_cointegration(self):
-        keys = self.price_df.dropna(axis=1).columns
+        # Asset-name pairs for callers; the trading path works on the index arrays of cointegrated_pairs
+        left, right = self.cointegrated_pairs()
+        return [(self.assets[i], self.assets[j]) for i, j in zip(left.tolist(), right.tolist())]
 
-        if len(keys) < 2:
-            return []  
+    def cointegrated_pairs(self):
+        prices = self.window.values()
+        valid = ~np.isnan(prices).any(axis=0)
 
-        n = len(keys)
-        cointegrated_pairs = []
-        
-        for i in range(n):
-            R1 = self.price_df[keys[i]]
-            for j in range(i + 1, n):
-                R2 = self.price_df[keys[j]]
-                X = np.vstack([np.ones(self.lookback), R2]).T
-                b, a = np.linalg.lstsq(X, R1, rcond=None)[0]
-                residuals = R1 - (b * R2 + a)
-                if np.allclose(np.var(residuals),0): 
-                    continue
-                p_value = adfuller(residuals)[1]
-                if p_value < self.significance:
-                    cointegrated_pairs.append((keys[i], keys[j]))
-        
-        return cointegrated_pairs  
+        if valid.sum() < 2:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        if self.fixed_pairs is not None:
+            # Fixed pairs are traded without a cointegration test once both windows are filled
+            left, right = self.fixed_pairs.T
+            mask = valid[left] & valid[right]
+            if self.restricted is not None:
+                mask &= self.restricted[self.book.pair_ids(left, right)]
+            return left[mask], right[mask]
+
+        cache = self.pair_cache
+        screen = self.pair_screen
+        candidates = valid[cache.left] & valid[cache.right]
+        stale = cache.stale(valid, self.window.latest(), self.ticks, self.timestamp)
+        if self.restricted is not None:
+            candidates &= self.restricted
+            stale &= self.restricted
+        autolag = 'aic' if self.adf_lags is None else None
+        if screen.is_enabled():
+            if screen.due(self.ticks):
+                cache.invalidate(screen.refresh(prices, valid, self.ticks))
+            screen.record(candidates)
+            if screen.audit_due(self.ticks):
+                # Full test of the screened-out pairs, for the report only; trading never sees these results
+                dropped = np.flatnonzero(candidates & ~screen.selected)
+                kept = 0
+                if len(dropped):
+                    p_value = engle_granger(prices, cache.left[dropped], cache.right[dropped],
+                                            maxlag=self.adf_lags, autolag=autolag)[3]
+                    with np.errstate(invalid='ignore'):
+                        kept = np.count_nonzero(p_value < self.significance)
+                screen.record_audit(self.ticks, len(dropped), kept)
+            stale &= screen.selected
+            candidates &= screen.selected
+
+        tested = np.flatnonzero(stale)
+        if len(tested):
+            hedge_ratio, intercept, _, p_value, residual_std = engle_granger(
+                prices, cache.left[tested], cache.right[tested], maxlag=self.adf_lags, autolag=autolag)
+            cache.update(tested, hedge_ratio, intercept, p_value, residual_std, self.ticks, self.timestamp)
+        cache.record(np.count_nonzero(candidates), tested)
+
+        selected = screen.selected if screen.is_enabled() else None
+        if self.restricted is not None:
+            selected = self.restricted if selected is None else selected & self.restricted
+        return cache.cointegrated(valid, self.significance, selected)
     
-    def generate_trading_signal(self, data):
-        df = pd.DataFrame(data).T[['bid_price', 'ask_price', 'mid_price']]
-        df.columns = ['bid_price', 'ask_price', 'mid_price']
-        self.price_df = pd.concat([self.price_df, df[['mid_price']].T], axis=0).ffill().tail(self.lookback)
+    def generate_trading_signal(self, bid, ask, mid, timestamp=None):
+        profiler = self.profiler
+        with profiler.stage('window'):
+            self.window.push(mid)
+        self.ticks += 1
+        self.timestamp = timestamp
 
-        if len(self.price_df) < self.lookback:
+        if not self.window.is_full():
             return
         
-        cointegrated_pairs = self.check_cointegration()
-        price_matrix = self.price_df.values
-        spread_matrix = price_matrix[:, None, :] - price_matrix[:, :, None]
-        mean_spread = np.mean(spread_matrix, axis=0)
-        var_spread = np.var(spread_matrix, axis=0)
-        z_scores = (spread_matrix[-1] - mean_spread) / (np.sqrt(var_spread) + 1e-8)
-        
-        self.orders.clear()
-        
-        if self.positions_df.empty:
-            self.positions_df = pd.DataFrame(0, index=[0], columns=self.price_df.columns)
-        missing_assets = set(self.price_df.columns) - set(self.positions_df.columns)
-        if missing_assets:
-            for asset in missing_assets:
-                self.positions_df[asset] = 0
-                
-        for (s1, s2) in cointegrated_pairs:
-            idx1, idx2 = self.price_df.columns.get_loc(s1), self.price_df.columns.get_loc(s2)
-            z_score = z_scores[idx1, idx2]
-            
-            conditions_buy = (self.positions_df[s1].iloc[-1] == 0) & (z_score > 1)
-            conditions_sell = (self.positions_df[s1].iloc[-1] == 0) & (z_score < -1)
-            conditions_close_buy = (self.positions_df[s1].iloc[-1] == 1) & (z_score < 0)
-            conditions_close_sell = (self.positions_df[s1].iloc[-1] == -1) & (z_score > 0)
-            
-            self.positions_df[s1] = np.where(conditions_buy, 1, 
-                                       np.where(conditions_sell, -1, 
-                                       np.where(conditions_close_buy | conditions_close_sell, 0, 
-                                       self.positions_df[s1].iloc[-1])))
-            
-            if conditions_buy.any():
-                self.orders[s1] = Order(asset=s1, price=df.loc[s1, 'bid_price'], direction=Direction.BUY, quantity=1)
-                self.orders[s2] = Order(asset=s2, price=df.loc[s2, 'bid_price'], direction=Direction.SELL, quantity=1)
-            elif conditions_sell.any():
-                self.orders[s2] = Order(asset=s2, price=df.loc[s2, 'bid_price'], direction=Direction.BUY, quantity=1)
-                self.orders[s1] = Order(asset=s1, price=df.loc[s1, 'bid_price'], direction=Direction.SELL, quantity=1)
-            elif conditions_close_buy.any() or conditions_close_sell.any():
-                self.orders[s1] = Order(asset=s1, price=df.loc[s1, 'bid_price'], direction=Direction.SELL, quantity=1)
-                self.orders[s2] = Order(asset=s2, price=df.loc[s2, 'bid_price'], direction=Direction.BUY, quantity=1)
-        
-        return self.orders
\ No newline at end of file
+        with profiler.stage('cointegration'):
+            left, right = self.cointegrated_pairs()
+        with profiler.stage('z_scores'):
+            z_scores = self.window.spread_z_scores()
+
+        # Each pair walks its own flat -> open -> flat cycle on the spread z-score: long the left leg above +1,
+        # short it below -1, and back to flat once z crosses zero
+        book = self.book
+        pairs = book.pair_ids(left, right)
+        z_score = z_scores[left, right]
+        position = book.position[pairs]
+        target = position.copy()
+        target[(position == 0) & (z_score > 1)] = 1
+        target[(position == 0) & (z_score < -1)] = -1
+        target[((position == 1) & (z_score < 0)) | ((position == -1) & (z_score > 0))] = 0
+        changed = target != position
+        if not changed.any():
+            return
+
+        hedge_ratio = self.pair_cache.hedge_ratio[pairs[changed]] if self.fixed_pairs is None else None
+        return book.execute(timestamp, pairs[changed], left[changed], right[changed], target[changed], bid, hedge_ratio)
@@ -0,0 +1,209 @@
+import time
+import asyncio
+import argparse
+import collections
+import numpy as np
+
+from .backtest import Backtest
+from .cli import configure_logging
+from .data_manager import DataManager
+from .strategy import Strategy
+from .tick_matrix import TickMatrix
+
+# `received` is the perf_counter_ns stamp taken when the source hands the tick over
+Tick = collections.namedtuple('Tick', ['timestamp', 'bid', 'ask', 'mid', 'received'])
+
+async def replay_source(matrix, speed=None):
+    # speed=None replays as fast as the consumer drains the queue, otherwise at `speed` times market time
+    start_wall = time.perf_counter()
+    start_market = matrix.timestamps[0] if len(matrix) else 0
+    for row in range(len(matrix)):
+        if speed:
+            delay = (matrix.timestamps[row] - start_market) / 1e9 / speed - (time.perf_counter() - start_wall)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield Tick(matrix.timestamps[row], matrix.bid[row], matrix.ask[row], matrix.mid[row], time.perf_counter_ns())
+
+async def socket_source(host, port, pairs):
+    # Reads "timestamp_ns,pair,bid,ask" lines; pairs that did not tick are NaN in the emitted row
+    reader, writer = await asyncio.open_connection(host, port)
+    columns = {pair: col for col, pair in enumerate(pairs)}
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            timestamp, pair, bid_price, ask_price = line.decode().strip().split(',')
+            if pair not in columns:
+                continue
+            bid = np.full(len(pairs), np.nan)
+            ask = np.full(len(pairs), np.nan)
+            bid[columns[pair]], ask[columns[pair]] = float(bid_price), float(ask_price)
+            yield Tick(np.int64(timestamp), bid, ask, (bid + ask) / 2, time.perf_counter_ns())
+    finally:
+        writer.close()
+
+async def serve_matrix(matrix, host='127.0.0.1', port=0, speed=None):
+    # Local stand-in for a live feed: every client gets the matrix replayed as one line per pair tick
+    async def handle(reader, writer):
+        try:
+            async for tick in replay_source(matrix, speed):
+                for col in np.flatnonzero(~np.isnan(tick.bid)):
+                    writer.write(f"{tick.timestamp},{matrix.pairs[col]},{float(tick.bid[col])!r},{float(tick.ask[col])!r}\n".encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    return await asyncio.start_server(handle, host, port)
+
+class LatencyStats:
+    def __init__(self, capacity=1 << 16):
+        self.ticks = np.empty(capacity, dtype=np.int64)
+        self.orders = np.empty(capacity, dtype=np.int64)
+        self.depths = np.empty(capacity, dtype=np.int32)
+        self.tick_count = 0
+        self.order_count = 0
+
+    @staticmethod
+    def _push(array, count, value):
+        if count == len(array):
+            array = np.resize(array, 2 * len(array))
+        array[count] = value
+        return array
+
+    def record(self, latency, depth, ordered):
+        self.ticks = self._push(self.ticks, self.tick_count, latency)
+        self.depths = self._push(self.depths, self.tick_count, depth)
+        self.tick_count += 1
+        if ordered:
+            self.orders = self._push(self.orders, self.order_count, latency)
+            self.order_count += 1
+
+    @staticmethod
+    def percentiles(latencies):
+        if not len(latencies):
+            return {'p50_us': np.nan, 'p99_us': np.nan, 'p99.9_us': np.nan, 'max_us': np.nan}
+        p50, p99, p999 = np.percentile(latencies, [50, 99, 99.9]) / 1e3
+        return {'p50_us': p50, 'p99_us': p99, 'p99.9_us': p999, 'max_us': latencies.max() / 1e3}
+
+    def summary(self):
+        depths = self.depths[:self.tick_count]
+        return {
+            'ticks': self.tick_count,
+            'orders': self.order_count,
+            'tick_latency': self.percentiles(self.ticks[:self.tick_count]),
+            'order_latency': self.percentiles(self.orders[:self.order_count]),
+            'queue_depth_mean': float(depths.mean()) if len(depths) else 0.0,
+            'queue_depth_max': int(depths.max()) if len(depths) else 0,
+        }
+
+class StreamingEngine:
+    def __init__(self, strategy, pairs, filename=None, stop_event=None, queue_size=1024):
+        self.backtest = Backtest(None, strategy, filename, stop_event, progress=False)
+        self.backtest.set_assets(pairs)
+        self.stop_event = stop_event
+        self.queue_size = queue_size
+        self.latency = LatencyStats()
+        self.elapsed = 0.0
+
+    @property
+    def results(self):
+        return self.backtest.results
+
+    def stopped(self):
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    async def produce(self, source, queue):
+        # A full queue blocks the put, so a slow consumer throttles the source instead of buffering without bound
+        try:
+            async for tick in source:
+                if self.stopped():
+                    break
+                await queue.put(tick)
+        finally:
+            await queue.put(None)
+
+    async def consume(self, queue, sources):
+        remaining = sources
+        while remaining:
+            tick = await queue.get()
+            if tick is None:
+                remaining -= 1
+                continue
+            depth = queue.qsize()
+            orders = self.backtest.on_tick(tick.timestamp, tick.bid, tick.ask, tick.mid)
+            self.latency.record(time.perf_counter_ns() - tick.received, depth, orders is not None)
+            if self.stopped():
+                print("Streaming stopped by user.")
+                break
+
+    async def run(self, *sources):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        started = time.perf_counter()
+        producers = [asyncio.create_task(self.produce(source, queue)) for source in sources]
+        try:
+            await self.consume(queue, len(producers))
+        finally:
+            for producer in producers:
+                producer.cancel()
+            outcomes = await asyncio.gather(*producers, return_exceptions=True)
+            self.backtest.save_results()
+            self.elapsed = time.perf_counter() - started
+        for outcome in outcomes:
+            # A source that failed mid-stream must not pass for one that simply ran out of ticks
+            if isinstance(outcome, Exception):
+                raise outcome
+        return self.summary()
+
+    def execute(self, *sources):
+        return asyncio.run(self.run(*sources))
+
+    def summary(self):
+        summary = self.latency.summary()
+        summary['seconds'] = self.elapsed
+        summary['ticks_per_s'] = summary['ticks'] / self.elapsed if self.elapsed > 0 else 0.0
+        return summary
+
+def format_summary(summary):
+    lines = [f"{summary['ticks']} ticks, {summary['orders']} order ticks in {summary['seconds']:.2f}s "
+             f"({summary['ticks_per_s']:.0f} ticks/s), queue depth mean {summary['queue_depth_mean']:.1f} max {summary['queue_depth_max']}"]
+    for name in ('tick_latency', 'order_latency'):
+        stats = summary[name]
+        lines.append(f"{name}: p50 {stats['p50_us']:.0f}us  p99 {stats['p99_us']:.0f}us  "
+                     f"p99.9 {stats['p99.9_us']:.0f}us  max {stats['max_us']:.0f}us")
+    return '\n'.join(lines)
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Replay ticks through the strategy as a live feed and report latency")
+    parser.add_argument('--pairs', required=True, help="Comma-separated assets")
+    parser.add_argument('--years', default='2023-2024', help="START-END, end exclusive")
+    parser.add_argument('--lookback', type=int, default=30)
+    parser.add_argument('--significance', type=float, default=0.025)
+    parser.add_argument('--speed', type=float, default=None, help="Replay speed as a multiple of market time; max speed if omitted")
+    parser.add_argument('--connect', default=None, help="HOST:PORT of a line feed to read instead of replaying stored data")
+    parser.add_argument('--queue-size', type=int, default=1024)
+    parser.add_argument('--data-folder', default='data')
+    parser.add_argument('--out', default=None, help="Ledger file for the streamed results")
+    return parser
+
+def main(args=None):
+    if not isinstance(args, argparse.Namespace):
+        args = build_parser().parse_args(args)
+    pairs = args.pairs.split(',')
+    strategy = Strategy(significance=args.significance, lookback=args.lookback)
+    engine = StreamingEngine(strategy, pairs, args.out, queue_size=args.queue_size)
+    if args.connect:
+        host, port = args.connect.rsplit(':', 1)
+        source = socket_source(host, int(port), pairs)
+    else:
+        start, end = (int(year) for year in args.years.split('-'))
+        data_manager = DataManager(fx_pairs=pairs, years=range(start, end), folder=args.data_folder)
+        source = replay_source(TickMatrix.from_arrays(data_manager.load_fx_arrays()), args.speed)
+    summary = engine.execute(source)
+    print(format_summary(summary))
+    return summary
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
@@ -0,0 +1,117 @@
+import os
+import time
+import logging
+import argparse
+import itertools
+import concurrent.futures
+import numpy as np
+import pandas as pd
+
+from .backtest import Backtest
+from .cli import configure_logging
+from .data_manager import DataManager
+from .strategy import Strategy
+from .tick_matrix import TickMatrix
+
+def build_grid(lookbacks, significances, year_ranges, baskets):
+    return [{'lookback': lookback, 'significance': significance, 'start_year': start, 'end_year': end, 'assets': list(basket)}
+            for lookback, significance, (start, end), basket in itertools.product(lookbacks, significances, year_ranges, baskets)]
+
+def summarize(results):
+    combined = results.sum(axis=1).to_numpy() if not results.empty else np.empty(0)
+    trades = results.to_numpy()[results.to_numpy() != 0] if not results.empty else np.empty(0)
+    equity = np.cumsum(combined)
+    drawdown = np.max(np.maximum.accumulate(np.r_[0, equity]) - np.r_[0, equity]) if len(equity) else 0.0
+    std = combined.std() if len(combined) > 1 else 0.0
+    return {
+        'total_return': float(combined.sum()),
+        'trades': int(len(trades)),
+        'win_rate': float((trades > 0).mean()) if len(trades) else 0.0,
+        'sharpe': float(combined.mean() / std * np.sqrt(len(combined))) if std > 0 else 0.0,
+        'max_drawdown': float(drawdown),
+    }
+
+def run_job(matrix_path, params):
+    # Workers attach to their basket's shared memory-mapped matrix; only the parameter dict crosses the process
+    # boundary. Each basket has its own matrix, so selecting a year range is a slice view and not a copy.
+    matrix = TickMatrix.load(matrix_path).select(params['assets'], f"{params['start_year']}-01-01", f"{params['end_year']}-01-01")
+    strategy = Strategy(significance=params['significance'], lookback=params['lookback'])
+    backtest = Backtest(matrix, strategy, None, None, progress=False)
+    started = time.perf_counter()
+    results = backtest.execute()
+    seconds = time.perf_counter() - started
+    summary = dict(params, assets=','.join(params['assets']), ticks=backtest.processed, seconds=seconds,
+                   ticks_per_s=backtest.processed / seconds if seconds > 0 else 0.0)
+    summary.update(summarize(results))
+    return summary
+
+class Sweep:
+    def __init__(self, grid, folder='data', out_folder='sweeps', workers=None):
+        self.grid = grid
+        self.folder = folder
+        self.out_folder = out_folder
+        self.workers = workers or os.cpu_count()
+        self.matrix_path = os.path.join(out_folder, 'matrix')
+
+    def basket_path(self, params):
+        return os.path.join(self.matrix_path, '_'.join(params['assets']))
+
+    def prepare(self, download=True):
+        assets = sorted({asset for params in self.grid for asset in params['assets']})
+        years = range(min(params['start_year'] for params in self.grid), max(params['end_year'] for params in self.grid))
+        data_manager = DataManager(fx_pairs=assets, years=years, folder=self.folder)
+        if download:
+            data_manager.download_missing_files()
+        columns = data_manager.load_fx_arrays()
+        # One matrix per basket, aligned on that basket's own ticks only
+        for basket in dict.fromkeys(tuple(params['assets']) for params in self.grid):
+            TickMatrix.from_arrays({asset: columns[asset] for asset in basket}).save(self.basket_path({'assets': basket}))
+
+    def run(self):
+        started = time.perf_counter()
+        rows = []
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(run_job, self.basket_path(params), params): params for params in self.grid}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    rows.append(future.result())
+                except Exception as e:
+                    logging.error(f"Sweep job {futures[future]} failed: {e}")
+        summary = pd.DataFrame(rows)
+        if not summary.empty:
+            summary = summary.sort_values(['lookback', 'significance', 'start_year', 'end_year', 'assets'], ignore_index=True)
+        os.makedirs(self.out_folder, exist_ok=True)
+        summary.to_csv(os.path.join(self.out_folder, 'summary.csv'), index=False)
+        logging.info(f"Sweep of {len(self.grid)} runs finished in {time.perf_counter() - started:.1f}s")
+        return summary
+
+def parse_year_range(value):
+    start, end = value.split('-')
+    return int(start), int(end)
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Run a grid of backtests in parallel over shared tick data")
+    parser.add_argument('--basket', action='append', required=True, help="Comma-separated assets; repeat for several baskets")
+    parser.add_argument('--lookback', type=int, nargs='+', default=[30])
+    parser.add_argument('--significance', type=float, nargs='+', default=[0.025])
+    parser.add_argument('--years', type=parse_year_range, nargs='+', default=[(2023, 2024)], help="START-END, end exclusive")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--data-folder', default='data')
+    parser.add_argument('--out', default='sweeps')
+    parser.add_argument('--no-download', action='store_true')
+    return parser
+
+def main(args=None):
+    if not isinstance(args, argparse.Namespace):
+        args = build_parser().parse_args(args)
+    baskets = [basket.split(',') for basket in args.basket]
+    grid = build_grid(args.lookback, args.significance, args.years, baskets)
+    sweep = Sweep(grid, folder=args.data_folder, out_folder=args.out, workers=args.workers)
+    sweep.prepare(download=not args.no_download)
+    summary = sweep.run()
+    print(summary.to_string(index=False))
+    return summary
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
@@ -0,0 +1,94 @@
+import os
+import json
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+
+class TickCache:
+    FIELDS = ('timestamps', 'bid', 'ask')
+
+    def __init__(self, folder='data', price_dtype=np.float64):
+        self.folder = folder
+        self.price_dtype = np.dtype(price_dtype)
+
+    def shard_path(self, pair, name):
+        return os.path.join(self.folder, pair, 'cache', name)
+
+    @staticmethod
+    def month_shard_name(pair, year, month):
+        return f'{pair}_{year}_{month:02d}'
+
+    def has_month(self, pair, year, month):
+        return self.read_meta(self.shard_path(pair, self.month_shard_name(pair, year, month))) is not None
+
+    @staticmethod
+    def source_stamp(source):
+        stat = os.stat(source)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def read_meta(self, path):
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, path, source):
+        meta = self.read_meta(path)
+        return (meta is not None and meta.get('source') == self.source_stamp(source)
+                and meta.get('price_dtype') == self.price_dtype.name)
+
+    def write(self, path, timestamps, bid, ask, meta=None):
+        self.write_arrays(path, {'timestamps': np.asarray(timestamps, dtype=np.int64),
+                                 'bid': np.asarray(bid, dtype=self.price_dtype),
+                                 'ask': np.asarray(ask, dtype=self.price_dtype)}, meta)
+
+    def write_arrays(self, path, arrays, meta=None):
+        # Arrays go to a sibling directory that is swapped in whole, and meta.json is written last,
+        # so a half-written shard is never mistaken for a valid one
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for field, array in arrays.items():
+            np.save(os.path.join(tmp_path, f'{field}.npy'), array)
+        meta = dict(meta or {}, rows=len(arrays['timestamps']), price_dtype=self.price_dtype.name, fields=list(arrays))
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_path, path)
+
+    def read(self, path, fields=FIELDS):
+        return tuple(np.load(os.path.join(path, f'{field}.npy'), mmap_mode='r') for field in fields)
+
+    def convert_csv(self, source, path):
+        df = pd.read_csv(
+            source,
+            names=['Datetime', 'bid_price', 'ask_price'],
+            skiprows=1,
+            dtype={'bid_price': 'float64', 'ask_price': 'float64'},
+            low_memory=False
+        )
+        timestamps = pd.to_datetime(df['Datetime'], format='ISO8601').to_numpy('datetime64[ns]').view(np.int64)
+        self.write(path, timestamps, df['bid_price'].to_numpy(), df['ask_price'].to_numpy(),
+                   meta={'source': self.source_stamp(source)})
+
+    def year_shards(self, pair, year):
+        # Shard directories holding one pair-year in time order, converting a stale yearly CSV first
+        source = os.path.join(self.folder, pair, f'{pair}_{year}.csv')
+        if not os.path.exists(source):
+            return [self.shard_path(pair, self.month_shard_name(pair, year, month))
+                    for month in range(1, 13) if self.has_month(pair, year, month)]
+        path = self.shard_path(pair, f'{pair}_{year}')
+        if not self.is_fresh(path, source):
+            logging.info(f"Converting {source} to the binary tick cache")
+            self.convert_csv(source, path)
+        return [path]
+
+    def load_year(self, pair, year):
+        shards = [self.read(path) for path in self.year_shards(pair, year)]
+        if not shards:
+            return None
+        if len(shards) == 1:
+            return shards[0]
+        return tuple(np.concatenate(field) for field in zip(*shards))
@@ -0,0 +1,109 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+class TickMatrix:
+    def __init__(self, timestamps, pairs, bid, ask, mid=None):
+        self.timestamps = timestamps
+        self.pairs = list(pairs)
+        self.bid = bid
+        self.ask = ask
+        self.mid = (bid + ask) / 2 if mid is None else mid
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @classmethod
+    def from_frames(cls, fx_data):
+        columns = {}
+        for pair, df in fx_data.items():
+            timestamps = pd.DatetimeIndex(df.index).as_unit('ns').asi8
+            columns[pair] = (timestamps, df['bid_price'].to_numpy(np.float64), df['ask_price'].to_numpy(np.float64))
+        return cls.from_arrays(columns)
+
+    @classmethod
+    def from_arrays(cls, columns):
+        pairs = list(columns)
+        series = [cls._dedupe(*columns[pair]) for pair in pairs]
+
+        if series:
+            timestamps = np.unique(np.concatenate([ts for ts, _, _ in series]))
+        else:
+            timestamps = np.empty(0, dtype=np.int64)
+
+        bid = np.full((len(timestamps), len(pairs)), np.nan)
+        ask = np.full((len(timestamps), len(pairs)), np.nan)
+        for col, (ts, bid_prices, ask_prices) in enumerate(series):
+            rows = np.searchsorted(timestamps, ts)
+            bid[rows, col] = bid_prices
+            ask[rows, col] = ask_prices
+
+        return cls(timestamps, pairs, bid, ask)
+
+    @staticmethod
+    def _dedupe(timestamps, bid, ask):
+        # Ticks sharing a timestamp collapse to the last one, so every pair maps to at most one row
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if len(timestamps) > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+            timestamps, bid, ask = timestamps[order], bid[order], ask[order]
+        keep = np.ones(len(timestamps), dtype=bool)
+        keep[:-1] = timestamps[1:] != timestamps[:-1]
+        return timestamps[keep], np.asarray(bid, dtype=np.float64)[keep], np.asarray(ask, dtype=np.float64)[keep]
+
+    def index(self):
+        return pd.DatetimeIndex(self.timestamps.view('datetime64[ns]'), name='Datetime')
+
+    def timestamp(self, row):
+        return pd.Timestamp(self.timestamps[row])
+
+    def last_valid_mid(self, row, block=4096):
+        # Last known mid of every pair strictly before `row`, scanning backwards a block at a time
+        values = np.full(len(self.pairs), np.nan)
+        missing = np.ones(len(self.pairs), dtype=bool)
+        stop = row
+        while stop > 0 and missing.any():
+            start = max(stop - block, 0)
+            chunk = self.mid[start:stop]
+            for col in np.flatnonzero(missing):
+                seen = np.flatnonzero(~np.isnan(chunk[:, col]))
+                if len(seen):
+                    values[col] = chunk[seen[-1], col]
+                    missing[col] = False
+            stop = start
+        return values
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for field in ('timestamps', 'bid', 'ask', 'mid'):
+            np.save(os.path.join(path, f'{field}.npy'), getattr(self, field))
+        with open(os.path.join(path, 'pairs.json'), 'w') as f:
+            json.dump(self.pairs, f)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        # Memory-mapped loads let many processes share one on-disk copy through the page cache
+        with open(os.path.join(path, 'pairs.json')) as f:
+            pairs = json.load(f)
+        timestamps, bid, ask, mid = (np.load(os.path.join(path, f'{field}.npy'), mmap_mode=mmap_mode)
+                                     for field in ('timestamps', 'bid', 'ask', 'mid'))
+        return cls(timestamps, pairs, bid, ask, mid)
+
+    def select(self, pairs=None, start=None, end=None):
+        # Sub-matrix for a basket and [start, end) time range without the rows where none of the basket ticked.
+        # When the basket is a run of adjacent columns that ticked on every row of the range, the result is a
+        # set of slice views, so a memory-mapped matrix stays shared between processes; otherwise it is a copy.
+        cols = [self.pairs.index(pair) for pair in pairs] if pairs is not None else list(range(len(self.pairs)))
+        first = 0 if start is None else int(np.searchsorted(self.timestamps, pd.Timestamp(start).value))
+        last = len(self) if end is None else int(np.searchsorted(self.timestamps, pd.Timestamp(end).value))
+        names = [self.pairs[col] for col in cols]
+        if cols and cols == list(range(cols[0], cols[0] + len(cols))):
+            window = (slice(first, last), slice(cols[0], cols[0] + len(cols)))
+            bid, ask, mid = self.bid[window], self.ask[window], self.mid[window]
+            if not np.isnan(bid).all(axis=1).any():
+                return TickMatrix(self.timestamps[first:last], names, bid, ask, mid)
+        bid = self.bid[first:last][:, cols]
+        keep = ~np.isnan(bid).all(axis=1)
+        return TickMatrix(np.asarray(self.timestamps[first:last])[keep], names, bid[keep],
+                          self.ask[first:last][:, cols][keep], self.mid[first:last][:, cols][keep])
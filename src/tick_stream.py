@@ -0,0 +1,167 @@
+import os
+import heapq
+import logging
+import resource
+import numpy as np
+
+from .tick_matrix import TickMatrix
+
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # ru_maxrss is the lifetime peak in KiB on Linux, which still upper-bounds the current figure
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class NpyColumn:
+    # Reads slices of an .npy file with plain file reads, so untouched parts never become resident as a memmap would
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        version = np.lib.format.read_magic(self.file)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, _, self.dtype = read_header(self.file)
+        self.rows = shape[0] if shape else 0
+        self.offset = self.file.tell()
+
+    def read(self, start, count):
+        self.file.seek(self.offset + start * self.dtype.itemsize)
+        return np.fromfile(self.file, dtype=self.dtype, count=count)
+
+    def close(self):
+        self.file.close()
+
+class PairReader:
+    def __init__(self, pair, shard_paths, chunk_rows=65536):
+        self.pair = pair
+        self.shard_paths = list(shard_paths)
+        self.chunk_rows = chunk_rows
+        self.carry = None
+        self.last_timestamp = None
+
+    def raw_chunks(self):
+        for path in self.shard_paths:
+            columns = [NpyColumn(os.path.join(path, f'{field}.npy')) for field in ('timestamps', 'bid', 'ask')]
+            try:
+                rows = columns[0].rows
+                for start in range(0, rows, self.chunk_rows):
+                    count = min(self.chunk_rows, rows - start)
+                    yield tuple(column.read(start, count) for column in columns)
+            finally:
+                for column in columns:
+                    column.close()
+
+    def chunks(self):
+        # The newest tick of each chunk is held back so a timestamp repeated across the chunk boundary
+        # still collapses to its last tick, exactly as TickMatrix.from_arrays does in memory
+        for timestamps, bid, ask in self.raw_chunks():
+            if self.carry is not None:
+                timestamps = np.concatenate([self.carry[0], timestamps])
+                bid = np.concatenate([self.carry[1], bid])
+                ask = np.concatenate([self.carry[2], ask])
+            timestamps, bid, ask = TickMatrix._dedupe(timestamps, bid, ask)
+            if self.last_timestamp is not None and len(timestamps) and timestamps[0] <= self.last_timestamp:
+                raise ValueError(f"{self.pair} ticks are not time-ordered across shards")
+            self.carry = (timestamps[-1:], bid[-1:], ask[-1:])
+            if len(timestamps) > 1:
+                self.last_timestamp = timestamps[-2]
+                yield timestamps[:-1], bid[:-1], ask[:-1]
+        if self.carry is not None and len(self.carry[0]):
+            yield self.carry
+        self.carry = None
+
+class MergedTickStream:
+    # Bytes per buffered tick (timestamp, bid, ask) and per aligned output row and column (bid, ask, mid)
+    TICK_BYTES = 24
+    CELL_BYTES = 24
+
+    def __init__(self, readers, memory_limit_mb=512):
+        self.readers = list(readers)
+        self.pairs = [reader.pair for reader in self.readers]
+        self.memory_limit_mb = memory_limit_mb
+        # Half the budget buffers raw chunks, the other half holds the aligned block handed downstream
+        budget = int(memory_limit_mb * 1024 * 1024) // 2
+        pairs = max(len(self.readers), 1)
+        self.chunk_rows = max(budget // (pairs * self.TICK_BYTES), 1024)
+        self.block_rows = max(budget // (8 + pairs * self.CELL_BYTES), 1024)
+        for reader in self.readers:
+            reader.chunk_rows = self.chunk_rows
+        self.rows = 0
+        self.blocks_emitted = 0
+        self.peak_rss = rss_bytes()
+
+    @classmethod
+    def from_cache(cls, cache, pairs, years, memory_limit_mb=512):
+        readers = []
+        for pair in pairs:
+            shard_paths = [path for year in years for path in cache.year_shards(pair, year)]
+            if shard_paths:
+                readers.append(PairReader(pair, shard_paths))
+        return cls(readers, memory_limit_mb)
+
+    @staticmethod
+    def _refill(chunks, buffer):
+        chunk = next(chunks, None)
+        if chunk is None:
+            return buffer
+        if buffer is None or not len(buffer[0]):
+            return chunk
+        return tuple(np.concatenate([old, new]) for old, new in zip(buffer, chunk))
+
+    def blocks(self):
+        # k-way merge at chunk granularity: the heap is keyed on the newest buffered timestamp of every pair, so
+        # everything up to the smallest such key is complete across all pairs and can be aligned and emitted
+        streams = [reader.chunks() for reader in self.readers]
+        buffers = [None] * len(streams)
+        heap = []
+        for col, chunks in enumerate(streams):
+            buffers[col] = self._refill(chunks, None)
+            if buffers[col] is not None:
+                heap.append((buffers[col][0][-1], col))
+        heapq.heapify(heap)
+
+        while heap:
+            frontier = heap[0][0]
+            cuts = [np.searchsorted(buffer[0], frontier, side='right') if buffer is not None else 0 for buffer in buffers]
+            timestamps = np.unique(np.concatenate([buffer[0][:cut] for buffer, cut in zip(buffers, cuts) if cut]))
+            if len(timestamps) > self.block_rows:
+                frontier = timestamps[self.block_rows - 1]
+                timestamps = timestamps[:self.block_rows]
+                cuts = [np.searchsorted(buffer[0], frontier, side='right') if buffer is not None else 0 for buffer in buffers]
+
+            bid = np.full((len(timestamps), len(streams)), np.nan)
+            ask = np.full((len(timestamps), len(streams)), np.nan)
+            for col, (buffer, cut) in enumerate(zip(buffers, cuts)):
+                if cut:
+                    rows = np.searchsorted(timestamps, buffer[0][:cut])
+                    bid[rows, col] = buffer[1][:cut]
+                    ask[rows, col] = buffer[2][:cut]
+                    buffers[col] = tuple(field[cut:] for field in buffer)
+
+            # Only pairs whose buffer was drained up to its key need their next chunk
+            while heap and not len(buffers[heap[0][1]][0]):
+                _, col = heapq.heappop(heap)
+                buffers[col] = self._refill(streams[col], buffers[col])
+                if len(buffers[col][0]):
+                    heapq.heappush(heap, (buffers[col][0][-1], col))
+
+            self.rows += len(timestamps)
+            self.blocks_emitted += 1
+            self.peak_rss = max(self.peak_rss, rss_bytes())
+            yield TickMatrix(timestamps, self.pairs, bid, ask)
+
+        logging.info(f"Merged {self.rows} rows of {len(self.pairs)} pairs in {self.blocks_emitted} blocks, "
+                     f"peak RSS {self.peak_rss / 2**20:.0f} MB (limit {self.memory_limit_mb} MB)")
+
+    def __iter__(self):
+        return self.blocks()
+
+    def stats(self):
+        return {
+            'rows': self.rows,
+            'blocks': self.blocks_emitted,
+            'chunk_rows': self.chunk_rows,
+            'block_rows': self.block_rows,
+            'memory_limit_mb': self.memory_limit_mb,
+            'peak_rss_mb': self.peak_rss / 2**20,
+        }
@@ -5,8 +5,6 @@ from histdata.api import Platform as P, TimeFrame as TF
 import zipfile
 import concurrent.futures
 import pandas as pd
-import logging
-logging.basicConfig(level=logging.DEBUG)
 
 
 
@@ -0,0 +1,177 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+from .backtest import Backtest
+from .cli import configure_logging
+from .data_manager import DataManager
+from .ledger import Ledger
+from .strategy import Strategy
+from .tick_matrix import TickMatrix
+
+def forward_fill(values):
+    rows = np.where(np.isnan(values), 0, np.arange(len(values))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    filled = values[rows, np.arange(values.shape[1])]
+    # Leading NaNs point at row 0 and stay NaN unless that row holds a price
+    filled[np.isnan(values[0]) & (rows == 0)] = np.nan
+    return filled
+
+def rolling_z_scores(mid, left, right, lookback, block=None):
+    # z of the spread p_right - p_left against its own trailing `lookback` window, the value
+    # RollingWindow.spread_z_scores yields at every tick; rows before a full window stay NaN.
+    # Window sums of the spread and its square are differences of running sums, as in RollingWindow,
+    # taken block by block around each block's mean so the sums stay small. A block holds about half a
+    # million spread values, so the temporaries stay a fixed size next to the T x pairs result.
+    spread = forward_fill(mid)
+    spread = spread[:, right] - spread[:, left]
+    z = np.full(spread.shape, np.nan)
+    block = block or max(2 ** 19 // max(spread.shape[1], 1), lookback)
+    for start in range(lookback - 1, len(spread), block):
+        stop = min(start + block, len(spread))
+        window = spread[start - lookback + 1:stop]
+        missing = np.isnan(window)
+        with np.errstate(invalid='ignore'):
+            shift = np.nan_to_num(np.nanmean(window, axis=0))
+        centered = np.where(missing, 0.0, window - shift)
+        sums = np.zeros((len(window) + 1, window.shape[1]))
+        squares = np.zeros_like(sums)
+        gaps = np.zeros(sums.shape, dtype=np.int64)
+        moves = np.zeros(sums.shape, dtype=np.int64)
+        np.cumsum(centered, axis=0, out=sums[1:])
+        np.cumsum(np.square(centered), axis=0, out=squares[1:])
+        np.cumsum(missing, axis=0, out=gaps[1:])
+        np.cumsum(centered[1:] != centered[:-1], axis=0, out=moves[2:])
+        mean = (sums[lookback:] - sums[:-lookback]) / lookback
+        var = (squares[lookback:] - squares[:-lookback]) / lookback - np.square(mean)
+        std = np.sqrt(np.maximum(var, 0)) + 1e-8
+        scores = (centered[lookback - 1:] - mean) / std
+        # A flat window scores exactly 0 rather than the rounding left in its sums, since exits test the sign
+        scores[moves[lookback:] == moves[1:1 - lookback or None]] = 0.0
+        # A window still holding a leading NaN has no z-score
+        z[start:stop] = np.where(gaps[lookback:] > gaps[:-lookback], np.nan, scores)
+    return z
+
+def next_at(indices, row):
+    at = np.searchsorted(indices, row)
+    return indices[at] if at < len(indices) else None
+
+def trade_cycles(z):
+    # The entry/exit state machine of Strategy.generate_trading_signal for one pair, jumping from event to
+    # event with searchsorted over precomputed threshold crossings instead of stepping through every tick
+    above_one, below_one = np.flatnonzero(z > 1), np.flatnonzero(z < -1)
+    positive, negative = np.flatnonzero(z > 0), np.flatnonzero(z < 0)
+    entries, exits, directions = [], [], []
+    row = 0
+    while True:
+        up, down = next_at(above_one, row), next_at(below_one, row)
+        if up is None and down is None:
+            break
+        direction = 1 if down is None or (up is not None and up < down) else -1
+        entry = up if direction == 1 else down
+        close = next_at(negative if direction == 1 else positive, entry + 1)
+        entries.append(entry)
+        directions.append(direction)
+        exits.append(-1 if close is None else close)
+        if close is None:
+            break
+        row = close + 1
+    return np.array(entries, dtype=np.int64), np.array(exits, dtype=np.int64), np.array(directions, dtype=np.int64)
+
+class VectorizedBacktest:
+    def __init__(self, matrix, pairs, lookback=30, filename=None):
+        self.matrix = matrix
+        self.lookback = lookback
+        self.filename = filename
+        self.pairs = Strategy.pair_indices(matrix.pairs, pairs)
+        self.left, self.right = self.pairs.T
+        self.ledger = None
+        self.trades = None
+
+    @property
+    def results(self):
+        return self.ledger.to_frame() if self.ledger is not None else pd.DataFrame()
+
+    def execute(self):
+        matrix = self.matrix
+        z = rolling_z_scores(matrix.mid, self.left, self.right, self.lookback)
+        trades = []
+        for col in range(len(self.pairs)):
+            entries, exits, directions = trade_cycles(z[:, col])
+            trades.append(pd.DataFrame({'pair': col, 'entry': entries, 'exit': exits, 'direction': directions}))
+        self.trades = pd.concat(trades, ignore_index=True) if trades else pd.DataFrame(columns=['pair', 'entry', 'exit', 'direction'])
+
+        # Every entry and exit tick is a ledger row; only exits carry returns. Orders are priced at the tick's
+        # raw bid like the event loop, so a pair that did not tick returns NaN, which the ledger books as 0.
+        closed = self.trades[self.trades['exit'] >= 0].sort_values(['exit', 'pair'])
+        pair, entries, exits, directions = (closed[name].to_numpy(np.int64) for name in ('pair', 'entry', 'exit', 'direction'))
+        rows = np.unique(np.concatenate([self.trades['entry'].to_numpy(np.int64), exits]))
+        returns = np.zeros((len(rows), len(matrix.pairs)))
+        left, right = self.left[pair], self.right[pair]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            left_returns = directions * (matrix.bid[exits, left] - matrix.bid[entries, left]) / matrix.bid[entries, left] * 100
+            right_returns = directions * (matrix.bid[entries, right] - matrix.bid[exits, right]) / matrix.bid[entries, right] * 100
+        # Positions are per pair, so pairs sharing an asset add up in its column when they close on the same tick
+        at = np.searchsorted(rows, exits)
+        np.add.at(returns, (at, left), np.where(np.isnan(left_returns), 0.0, left_returns))
+        np.add.at(returns, (at, right), np.where(np.isnan(right_returns), 0.0, right_returns))
+
+        touched = np.stack([left, right], axis=1).ravel()
+        _, first = np.unique(touched, return_index=True)
+        self.ledger = Ledger(matrix.pairs, self.filename)
+        self.ledger.extend(np.asarray(matrix.timestamps)[rows], returns, touched[np.sort(first)].tolist())
+        return self.results
+
+def cross_check(matrix, pairs, lookback=30):
+    # Runs the vectorized and the event-driven backtest on the same data and fixed pairs and diffs their ledgers
+    started = time.perf_counter()
+    vectorized = VectorizedBacktest(matrix, pairs, lookback).execute()
+    vectorized_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    event = Backtest(matrix, Strategy(lookback=lookback, pairs=pairs), None, None, progress=False).execute()
+    event_seconds = time.perf_counter() - started
+
+    columns = sorted(set(vectorized.columns) | set(event.columns))
+    left = vectorized.reindex(columns=columns, fill_value=0.0)
+    right = event.reindex(columns=columns, fill_value=0.0)
+    same_index = left.index.equals(right.index)
+    return {
+        'ticks': len(matrix),
+        'vectorized_rows': len(left),
+        'event_rows': len(right),
+        'mismatched_timestamps': len(left.index.symmetric_difference(right.index)),
+        'max_abs_diff': float(np.abs(left.to_numpy() - right.to_numpy()).max(initial=0.0)) if same_index else np.nan,
+        'same_columns': list(vectorized.columns) == list(event.columns),
+        'vectorized_seconds': vectorized_seconds,
+        'event_seconds': event_seconds,
+        'speedup': event_seconds / vectorized_seconds if vectorized_seconds > 0 else np.inf,
+    }
+
+def parse_pairs(value):
+    return [tuple(pair.split(':')) for pair in value.split(',')]
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Cross-check the vectorized backtest against the event-driven one")
+    parser.add_argument('--pairs', type=parse_pairs, required=True, help="Comma-separated A:B pairs")
+    parser.add_argument('--years', default='2023-2024', help="START-END, end exclusive")
+    parser.add_argument('--lookback', type=int, default=30)
+    parser.add_argument('--data-folder', default='data')
+    return parser
+
+def main(args=None):
+    if not isinstance(args, argparse.Namespace):
+        args = build_parser().parse_args(args)
+    assets = sorted({asset for pair in args.pairs for asset in pair})
+    start, end = (int(year) for year in args.years.split('-'))
+    data_manager = DataManager(fx_pairs=assets, years=range(start, end), folder=args.data_folder)
+    matrix = TickMatrix.from_arrays(data_manager.load_fx_arrays())
+    report = cross_check(matrix, args.pairs, args.lookback)
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    return report
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_backtest_imports_leave_the_dashboard_unloaded():
+    # The modules run_backtest imports, loaded in a fresh interpreter
+    code = ("import sys\n"
+            "from src.cli import build_parser\n"
+            "from src.backtest import Backtest\n"
+            "from src.data_manager import DataManager\n"
+            "from src.jobs import JobManager, result_path\n"
+            "from src.profiler import Profiler\n"
+            "from src.strategy import Strategy\n"
+            "from src.tick_matrix import TickMatrix\n"
+            "print(sorted(name for name in sys.modules if name.split('.')[0] in ('plotly', 'dash', 'histdata')))\n")
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from statsmodels.tsa.stattools import adfuller
+
+from src.cointegration import adf_test, engle_granger
+
+# Newer statsmodels announce a change of adfuller's return type; the tuple prefix used here is stable
+pytestmark = pytest.mark.filterwarnings('ignore:adfuller currently returns:FutureWarning')
+
+def synthetic_series(length, seed):
+    # Random walks, stationary AR(1) series and a near-constant walk, one per column
+    rng = np.random.default_rng(seed)
+    walks = np.cumsum(rng.normal(size=(length, 20)), axis=0)
+    noise = rng.normal(size=(length, 20))
+    stationary = np.empty_like(noise)
+    stationary[0] = noise[0]
+    for row in range(1, length):
+        stationary[row] = 0.5 * stationary[row - 1] + noise[row]
+    small = 1.0 + 1e-5 * np.cumsum(rng.normal(size=(length, 1)), axis=0)
+    return np.concatenate([walks, stationary, small], axis=1)
+
+def synthetic_prices(length, seed):
+    # Assets 0 and 1 share a random walk, asset 2 is driven by it with AR(1) noise, asset 3 walks alone
+    rng = np.random.default_rng(seed)
+    trend = 100 + np.cumsum(rng.normal(size=length))
+    noise = rng.normal(size=length)
+    for row in range(1, length):
+        noise[row] += 0.6 * noise[row - 1]
+    return np.stack([trend + rng.normal(size=length), 0.5 * trend + 3 + rng.normal(size=length),
+                     2 * trend + noise, 100 + np.cumsum(rng.normal(size=length))], axis=1)
+
+@pytest.mark.parametrize('length', [30, 60, 250])
+@pytest.mark.parametrize('seed', [0, 1])
+def test_adf_test_autolag_matches_adfuller(length, seed):
+    series = synthetic_series(length, seed)
+    stats, pvalues, lags = adf_test(series)
+    for col in range(series.shape[1]):
+        stat, pvalue, lag = adfuller(series[:, col], autolag='AIC')[:3]
+        assert lags[col] == lag
+        assert stats[col] == pytest.approx(stat, rel=1e-6)
+        assert pvalues[col] == pytest.approx(pvalue, rel=1e-6, abs=1e-12)
+
+@pytest.mark.parametrize('maxlag', [0, 1, 4])
+def test_adf_test_fixed_lag_matches_adfuller(maxlag):
+    series = synthetic_series(120, 2)
+    stats, pvalues, lags = adf_test(series, maxlag=maxlag, autolag=None)
+    assert (lags == maxlag).all()
+    for col in range(series.shape[1]):
+        stat, pvalue, lag = adfuller(series[:, col], maxlag=maxlag, autolag=None)[:3]
+        assert lag == maxlag
+        assert stats[col] == pytest.approx(stat, rel=1e-6)
+        assert pvalues[col] == pytest.approx(pvalue, rel=1e-6, abs=1e-12)
+
+@pytest.mark.parametrize('autolag, maxlag', [('aic', None), (None, 2)])
+def test_engle_granger_matches_adfuller_on_ols_residuals(autolag, maxlag):
+    prices = synthetic_prices(300, 3)
+    left, right = np.triu_indices(prices.shape[1], k=1)
+    slopes, intercepts, stats, pvalues, residual_std = engle_granger(prices, left, right, maxlag, autolag)
+    for pair, (a, b) in enumerate(zip(left, right)):
+        design = np.stack([np.ones(len(prices)), prices[:, b]], axis=1)
+        (intercept, slope), *_ = np.linalg.lstsq(design, prices[:, a], rcond=None)
+        residuals = prices[:, a] - design @ [intercept, slope]
+        stat, pvalue = adfuller(residuals, maxlag=maxlag, autolag='AIC' if autolag else None)[:2]
+        assert slopes[pair] == pytest.approx(slope, rel=1e-8)
+        assert intercepts[pair] == pytest.approx(intercept, rel=1e-8, abs=1e-8)
+        assert residual_std[pair] == pytest.approx(residuals.std(), rel=1e-8)
+        assert stats[pair] == pytest.approx(stat, rel=1e-6)
+        assert pvalues[pair] == pytest.approx(pvalue, rel=1e-6, abs=1e-12)
@@ -0,0 +1,32 @@
+import numpy as np
+
+from src.bench import generate_fx_data
+from src.tick_matrix import TickMatrix
+from src.vectorized import cross_check
+
+def test_select_drops_rows_where_the_basket_never_ticked():
+    full = TickMatrix.from_frames(generate_fx_data(6, 2000, 1))
+    selected = full.select(full.pairs[0:2])
+    own = TickMatrix.from_frames({pair: frame for pair, frame in generate_fx_data(6, 2000, 1).items() if pair in full.pairs[0:2]})
+    assert np.array_equal(selected.timestamps, own.timestamps)
+    assert np.array_equal(selected.bid, own.bid, equal_nan=True)
+    assert np.array_equal(selected.mid, own.mid, equal_nan=True)
+
+def test_selected_matrix_cross_checks_against_event_driven():
+    full = TickMatrix.from_frames(generate_fx_data(6, 2000, 1))
+    selected = full.select(full.pairs[0:2])
+    report = cross_check(selected, [(selected.pairs[0], selected.pairs[1])], lookback=30)
+    assert report['ticks'] == len(selected)
+    assert report['vectorized_rows'] == report['event_rows'] > 0
+    assert report['mismatched_timestamps'] == 0
+    assert report['max_abs_diff'] < 1e-9
+
+def test_select_of_a_full_basket_shares_memory(tmp_path):
+    basket = TickMatrix.from_frames(generate_fx_data(3, 1000, 2))
+    basket.save(tmp_path)
+    loaded = TickMatrix.load(tmp_path)
+    start = str(np.asarray(loaded.timestamps[100]).view('datetime64[ns]'))
+    selected = loaded.select(loaded.pairs, start)
+    assert len(selected) == len(loaded) - 100
+    for field in ('timestamps', 'bid', 'ask', 'mid'):
+        assert np.shares_memory(getattr(selected, field), getattr(loaded, field))
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from src.bench import generate_fx_data
+from src.tick_matrix import TickMatrix
+from src.vectorized import cross_check, forward_fill, rolling_z_scores
+
+@pytest.mark.parametrize('lookback', [1, 30, 200])
+def test_rolling_z_scores_match_full_windows(lookback):
+    rng = np.random.default_rng(0)
+    mid = 1.1 + np.cumsum(rng.normal(0, 1e-4, (3000, 5)), axis=0)
+    mid[rng.random(mid.shape) < 0.4] = np.nan
+    mid[:400, 3] = np.nan
+    left, right = np.triu_indices(5, k=1)
+    z = rolling_z_scores(mid, left, right, lookback, block=512)
+
+    filled = forward_fill(mid)
+    spread = filled[:, right] - filled[:, left]
+    expected = np.full(spread.shape, np.nan)
+    for row in range(lookback - 1, len(spread)):
+        window = spread[row - lookback + 1:row + 1]
+        expected[row] = (spread[row] - window.mean(axis=0)) / (window.std(axis=0) + 1e-8)
+    assert np.array_equal(np.isnan(z), np.isnan(expected))
+    assert np.allclose(z, expected, rtol=1e-6, atol=1e-6, equal_nan=True)
+
+def test_vectorized_ledger_matches_event_driven():
+    matrix = TickMatrix.from_frames(generate_fx_data(6, 4000, 1))
+    pairs = [(matrix.pairs[0], matrix.pairs[1]), (matrix.pairs[2], matrix.pairs[3]), (matrix.pairs[0], matrix.pairs[4])]
+    report = cross_check(matrix, pairs, lookback=30)
+    assert report['vectorized_rows'] == report['event_rows'] > 0
+    assert report['mismatched_timestamps'] == 0
+    assert report['max_abs_diff'] < 1e-9
+    assert report['same_columns']